@@ -0,0 +1,175 @@
+"""OCR throughput and accuracy benchmark over the bundled Products/ photos.
+
+Every configuration runs the real pipeline (ocr_images_to_products) in a fresh
+child process with an empty cache, so each one pays the full cold-run cost and
+gets its own CPU time and peak RSS. Accuracy is measured field by field
+(article, colour, size, pair) against the existing output/ocr/*.json results,
+used as golden data.
+
+	python benchmark_ocr.py --workers 1,4 --engines subprocess,tesserocr --limit 40
+
+The learned search order (ocr_stats.json) is not used, so every run starts
+from the same static order and results are comparable.
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+try:
+	import resource
+except ImportError:  # Windows
+	resource = None
+
+FIELDS = ["article", "colour", "size", "pair"]
+
+
+def _norm(value) -> str:
+	return " ".join(str(value or "").lower().split())
+
+
+def _peak_rss_mb(who: int) -> Optional[float]:
+	# ru_maxrss is KiB on Linux and bytes on macOS; for RUSAGE_CHILDREN it is
+	# the largest single child, not the sum
+	if resource is None:
+		return None
+	peak = resource.getrusage(who).ru_maxrss
+	return round(peak / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+
+def _cpu_seconds() -> Optional[float]:
+	# Parent plus every finished child: pool workers and tesseract processes
+	if resource is None:
+		return round(time.process_time(), 2)
+	own = resource.getrusage(resource.RUSAGE_SELF)
+	kids = resource.getrusage(resource.RUSAGE_CHILDREN)
+	return round(own.ru_utime + own.ru_stime + kids.ru_utime + kids.ru_stime, 2)
+
+
+def run_one(config: Dict) -> Dict:
+	# Runs in the child process started by main()
+	from src.ocr_parser import OcrOptions, list_images, ocr_images_to_products
+
+	fnames = list_images(config["images_dir"])
+	if config.get("limit"):
+		fnames = fnames[:config["limit"]]
+	work = tempfile.mkdtemp(prefix="ocr_bench_")
+	try:
+		cache = os.path.join(work, "ocr.sqlite" if config.get("sqlite") else "ocr")
+		thumbs = os.path.join(work, "thumbs")
+		os.makedirs(thumbs)
+		options = OcrOptions(scoring=config["scoring"], quality_bar=config["quality"], engine=config["engine"], roi=config["roi"], batch_size=config["batch"], approaches=config.get("approaches"))
+		start = time.perf_counter()
+		products = ocr_images_to_products(
+			config["images_dir"], cache, thumbs, force=True, workers=config["workers"], options=options,
+			fnames=fnames, report_path=os.path.join(work, "timing.json"),
+		)
+		wall = time.perf_counter() - start
+		with open(os.path.join(work, "timing.json"), encoding="utf-8") as f:
+			summary = json.load(f)["summary"]
+	finally:
+		shutil.rmtree(work, ignore_errors=True)
+	return {
+		"images": len(fnames),
+		"wall_seconds": round(wall, 2),
+		"images_per_second": round(len(fnames) / wall, 3) if wall else None,
+		"cpu_seconds": _cpu_seconds(),
+		"peak_rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+		"peak_child_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+		"stage_seconds": summary["stage_seconds"],
+		"wasted_attempts": summary["wasted_attempts"],
+		"products": {p["image"]: {k: p.get(k) for k in FIELDS} for p in products},
+	}
+
+
+def load_golden(golden: str) -> Dict[str, Dict]:
+	from src.ocr_cache import open_cache_store
+
+	return dict(open_cache_store(golden).items())
+
+
+def score(products: Dict[str, Dict], golden: Dict[str, Dict]) -> Dict:
+	common = [image for image in products if image in golden]
+	per_field = {}
+	for field in FIELDS:
+		hits = sum(1 for image in common if _norm(products[image].get(field)) == _norm(golden[image].get(field)))
+		per_field[field] = round(hits / len(common), 3) if common else None
+	exact = sum(1 for image in common if all(_norm(products[image].get(f)) == _norm(golden[image].get(f)) for f in FIELDS))
+	return {
+		"compared": len(common),
+		"field_accuracy": per_field,
+		"all_fields": round(exact / len(common), 3) if common else None,
+	}
+
+
+def _run_child(config: Dict) -> Dict:
+	proc = subprocess.run(
+		[sys.executable, os.path.abspath(__file__), "--run_one", json.dumps(config)],
+		stdout=subprocess.PIPE, text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+	)
+	if proc.returncode != 0:
+		raise RuntimeError(f"benchmark run failed for {config}")
+	# The result is the last line; everything before it is pipeline chatter
+	return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark OCR throughput and accuracy over Products/")
+	parser.add_argument("--images_dir", default="Products")
+	parser.add_argument("--golden", default=os.path.join("output", "ocr"), help="Golden OCR results: a directory of per-image JSON or an ocr.sqlite")
+	parser.add_argument("--workers", default="1", help="Comma-separated worker counts to try (0 = one per CPU core)")
+	parser.add_argument("--engines", default="subprocess", help="Comma-separated OCR engines to try")
+	parser.add_argument("--scoring", default="confidence", help="Comma-separated scoring modes to try")
+	parser.add_argument("--batch", default="0", help="Comma-separated --ocr_batch sizes to try")
+	parser.add_argument("--quality", type=float, default=0.8)
+	parser.add_argument("--approaches", help="Preprocessing variants to search, as for main.py --ocr_approaches (default: the PIL chain)")
+	parser.add_argument("--no_roi", action="store_true")
+	parser.add_argument("--sqlite", action="store_true", help="Use the single-file SQLite OCR cache instead of per-image JSON")
+	parser.add_argument("--limit", type=int, default=0, help="Only the first N images (0 = all)")
+	parser.add_argument("--json", help="Also write the full results here")
+	parser.add_argument("--run_one", help=argparse.SUPPRESS)
+	args = parser.parse_args()
+
+	if args.run_one:
+		print(json.dumps(run_one(json.loads(args.run_one))))
+		return
+
+	golden = load_golden(args.golden)
+	print(f"Golden entries: {len(golden)} from {args.golden}")
+	grid = itertools.product(
+		args.engines.split(","), [int(w) for w in args.workers.split(",")],
+		args.scoring.split(","), [int(b) for b in args.batch.split(",")],
+	)
+	results: List[Dict] = []
+	header = f"{'engine':<11}{'workers':>8}{'scoring':>12}{'batch':>6}{'img/s':>8}{'wall s':>9}{'cpu s':>9}{'rss MB':>8}{'article':>9}{'colour':>8}{'size':>7}{'pair':>7}{'all':>7}"
+	print(header)
+	for engine, workers, scoring, batch in grid:
+		config = {
+			"images_dir": args.images_dir, "engine": engine, "workers": workers, "scoring": scoring,
+			"batch": batch, "quality": args.quality, "roi": not args.no_roi, "limit": args.limit,
+			"sqlite": args.sqlite, "approaches": args.approaches.split(",") if args.approaches else None,
+		}
+		run = _run_child(config)
+		accuracy = score(run.pop("products"), golden)
+		results.append({"config": config, **run, **accuracy})
+		acc = {k: str(v) for k, v in accuracy["field_accuracy"].items()}
+		rss = max(v for v in (run["peak_rss_mb"], run["peak_child_rss_mb"], 0.0) if v is not None)
+		print(
+			f"{engine:<11}{workers:>8}{scoring:>12}{batch:>6}{run['images_per_second']!s:>8}{run['wall_seconds']:>9}"
+			f"{run['cpu_seconds']:>9}{rss:>8}{acc['article']:>9}{acc['colour']:>8}{acc['size']:>7}{acc['pair']:>7}{accuracy['all_fields']!s:>7}"
+		)
+
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as f:
+			json.dump(results, f, indent=2)
+		print("Results:", args.json)
+
+
+if __name__ == "__main__":
+	main()
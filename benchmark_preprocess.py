@@ -0,0 +1,141 @@
+"""Preprocessing variant benchmark: speed and OCR yield per variant.
+
+Each image in Products/ is decoded once; every variant in src.preprocess
+(the PIL chain and the NumPy ones) is then built from its own copy of those
+pixels and OCR'd with one PSM. Reported per variant: milliseconds to build
+it, milliseconds of tesseract on it, mean score and field coverage as the
+pipeline computes them, how often it alone would have cleared the quality
+bar, and field accuracy against the existing output/ocr results.
+
+	python benchmark_preprocess.py --limit 60 --region label
+
+The last line is an --ocr_approaches order for main.py: variants by accepted
+results per second of preprocessing plus OCR.
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+from benchmark_ocr import FIELDS, _norm, load_golden
+from src.ocr_parser import _APPROACHES, _DIRECT_CONFIG, _data_to_text, _field_coverage, _parse_text_to_fields, _score_result, get_engine, list_images
+from src.preprocess import VARIANTS, PreparedImage, find_label_roi
+
+
+def _regions(path: str, region: str):
+	# (name, pixels) pairs to test on: the full frame, the label crop, or both
+	with PreparedImage(path) as prepared:
+		base = prepared.base
+		if region in ("full", "both"):
+			yield "full", base.copy()
+		if region in ("label", "both"):
+			box = find_label_roi(base)
+			if box is not None:
+				yield "label", base.crop(box)
+
+
+def bench_image(engine, path: str, image: str, variants: List[str], config: str, quality: float, golden: Dict, region: str) -> List[Dict]:
+	rows = []
+	for where, pixels in _regions(path, region):
+		for name in variants:
+			# A fresh PreparedImage per variant, so each pays for everything
+			# it derives from (e.g. the gray conversion) and nothing else
+			with PreparedImage(path, base=pixels.copy()) as prepared:
+				start = time.perf_counter()
+				img = prepared.variant(name)
+				prep = time.perf_counter() - start
+				start = time.perf_counter()
+				text, confidence = _data_to_text(engine.image_to_data(img, config))
+				ocr = time.perf_counter() - start
+			fields = _parse_text_to_fields(text)
+			score = _score_result(text, confidence)
+			row = {
+				"image": image, "region": where, "variant": name,
+				"prep_ms": prep * 1000, "ocr_ms": ocr * 1000, "score": score,
+				"coverage": _field_coverage(fields, text) if text.strip() else 0.0,
+				"accepted": bool(text.strip()) and score >= quality,
+			}
+			if image in golden:
+				row["correct"] = all(_norm(fields.get(f)) == _norm(golden[image].get(f)) for f in FIELDS)
+			rows.append(row)
+		pixels.close()
+	return rows
+
+
+def summarize(rows: List[Dict]) -> Dict[str, Dict]:
+	by_variant: Dict[str, List[Dict]] = {}
+	for row in rows:
+		by_variant.setdefault(row["variant"], []).append(row)
+	summary = {}
+	for name, runs in by_variant.items():
+		seconds = sum(r["prep_ms"] + r["ocr_ms"] for r in runs) / 1000
+		accepted = sum(1 for r in runs if r["accepted"])
+		graded = [r["correct"] for r in runs if "correct" in r]
+		summary[name] = {
+			"runs": len(runs),
+			"prep_ms": round(sum(r["prep_ms"] for r in runs) / len(runs), 2),
+			"ocr_ms": round(sum(r["ocr_ms"] for r in runs) / len(runs), 1),
+			"score": round(sum(r["score"] for r in runs) / len(runs), 3),
+			"coverage": round(sum(r["coverage"] for r in runs) / len(runs), 3),
+			"accepted": round(accepted / len(runs), 3),
+			"correct": round(sum(graded) / len(graded), 3) if graded else None,
+			"accepted_per_second": round(accepted / seconds, 3) if seconds else None,
+		}
+	return summary
+
+
+def main():
+	parser = argparse.ArgumentParser(description="Benchmark preprocessing variants for speed and OCR yield")
+	parser.add_argument("--images_dir", default="Products")
+	parser.add_argument("--golden", default=os.path.join("output", "ocr"), help="Golden OCR results: a directory of per-image JSON or an ocr.sqlite")
+	parser.add_argument("--variants", default=",".join(VARIANTS), help="Comma-separated variants to compare")
+	parser.add_argument("--region", choices=["full", "label", "both"], default="both", help="OCR the full frame, the detected label crop, or both")
+	parser.add_argument("--psm", default=_DIRECT_CONFIG, help="tesseract config used for every variant")
+	parser.add_argument("--engine", default="subprocess")
+	parser.add_argument("--quality", type=float, default=0.8)
+	parser.add_argument("--limit", type=int, default=0, help="Only the first N images (0 = all)")
+	parser.add_argument("--json", help="Also write every measurement here")
+	args = parser.parse_args()
+
+	variants = [v.strip() for v in args.variants.split(",")]
+	unknown = [v for v in variants if v not in VARIANTS]
+	if unknown:
+		parser.error(f"unknown variants: {', '.join(unknown)}")
+	golden = load_golden(args.golden) if os.path.exists(args.golden) else {}
+	fnames = list_images(args.images_dir)
+	if args.limit:
+		fnames = fnames[:args.limit]
+	engine = get_engine(args.engine)
+
+	rows: List[Dict] = []
+	for i, fname in enumerate(fnames, 1):
+		try:
+			rows.extend(bench_image(engine, os.path.join(args.images_dir, fname), fname, variants, args.psm, args.quality, golden, args.region))
+		except Exception as e:
+			print(f"Warning: Skipping {fname}: {e}")
+		if i % 10 == 0:
+			print(f"  {i}/{len(fnames)} images")
+
+	summary = summarize(rows)
+	print(f"{'variant':<11}{'chain':>6}{'prep ms':>9}{'ocr ms':>9}{'score':>7}{'fields':>8}{'accept':>8}{'correct':>9}{'acc/s':>7}")
+	for name in variants:
+		if name not in summary:
+			continue
+		s = summary[name]
+		chain = "PIL" if name in _APPROACHES else "NumPy"
+		print(
+			f"{name:<11}{chain:>6}{s['prep_ms']:>9}{s['ocr_ms']:>9}{s['score']:>7}{s['coverage']:>8}"
+			f"{s['accepted']:>8}{s['correct']!s:>9}{s['accepted_per_second']!s:>7}"
+		)
+	ranked = sorted(summary, key=lambda name: -(summary[name]["accepted_per_second"] or 0))
+	print("Suggested order: --ocr_approaches " + ",".join(ranked))
+
+	if args.json:
+		with open(args.json, "w", encoding="utf-8") as f:
+			json.dump({"summary": summary, "runs": rows}, f, indent=2)
+		print("Results:", args.json)
+
+
+if __name__ == "__main__":
+	main()
@@ -1,35 +1,106 @@
 import argparse
 import os
-from src.ocr_parser import ocr_images_to_products
-from src.rate_parser import parse_rate_list
-from src.matching import match_products_with_rates
-from src.output import write_csv, write_html
+from src.dedup import DEFAULT_MAX_DISTANCE
+from src.ocr_cache import open_cache_store
+from src.ocr_parser import ENGINES, OcrOptions, iter_ocr_products, ocr_images_to_products
+from src.rate_parser import RATE_CACHE_NAME, parse_rate_list
+from src.matching import RateIndex, iter_match_products, match_products_with_rates
+from src.watch import CatalogWatcher
+from src.output import CsvStreamWriter, JsonlStreamWriter, read_jsonl, write_csv, write_html
+from src.preprocess import VARIANTS
 
 
 def ensure_dir(path: str) -> None:
 	os.makedirs(path, exist_ok=True)
 
 
+def rate_cache_path(out_dir: str) -> str:
+	# Parsed rate list rows, reused while the PDF's bytes stay the same
+	return os.path.join(out_dir, RATE_CACHE_NAME)
+
+
+def open_sqlite_cache(out_dir: str) -> str:
+	# The first run with the SQLite cache takes over the per-image JSON files
+	# in one go, so switching layouts does not re-OCR anything
+	db_path = os.path.join(out_dir, "ocr.sqlite")
+	json_dir = os.path.join(out_dir, "ocr")
+	if not os.path.exists(db_path) and os.path.isdir(json_dir):
+		imported = open_cache_store(db_path).import_dir(json_dir)
+		print(f"  Imported {imported} OCR cache entries from {json_dir} into {db_path}")
+	return db_path
+
+
 def main():
 	parser = argparse.ArgumentParser(description="Generate product catalog from images + rate list")
 	parser.add_argument("--images_dir", required=True, help="Path to images folder (e.g., Products)")
 	parser.add_argument("--rate_list", required=True, help="Path to RATE LIST.pdf")
 	parser.add_argument("--out_dir", default="output", help="Output directory")
 	parser.add_argument("--force_ocr", action="store_true", help="Re-run OCR even if cache exists")
+	parser.add_argument("--workers", type=int, default=1, help="Number of OCR (and rate list page) worker processes (0 = one per CPU core)")
+	parser.add_argument("--ocr_scoring", choices=["confidence", "length"], default="confidence", help="How OCR attempts are ranked: tesseract word confidence + parsed fields, or longest text")
+	parser.add_argument("--ocr_quality", type=float, default=0.8, help="Stop searching preprocessing/PSM combinations once a result scores at least this (0-1, confidence scoring only)")
+	parser.add_argument("--ocr_engine", choices=sorted(ENGINES), default="subprocess", help="OCR backend: tesseract subprocess per call, or tesserocr with models kept loaded")
+	parser.add_argument("--ocr_batch", type=int, default=0, help="OCR the label crops of N images in one tesseract run first, and search per image only where that misses the quality bar (0 = off)")
+	parser.add_argument("--dedup", action="store_true", help="OCR only one of each group of near-identical photos (perceptual hash) and copy its fields to the rest")
+	parser.add_argument("--dedup_distance", type=int, default=DEFAULT_MAX_DISTANCE, help="Max differing dHash bits (of 256) for two photos to count as duplicates")
+	parser.add_argument("--ocr_timeout", type=float, default=0, help="Seconds of OCR per image before its best partial result is kept and it is flagged for a retry (0 = no limit)")
+	parser.add_argument("--ocr_attempt_timeout", type=float, default=0, help="Seconds a single tesseract call may take (0 = no limit)")
+	parser.add_argument("--ocr_approaches", help=f"Comma-separated preprocessing variants to search, in order (default: the PIL chain). Known: {', '.join(VARIANTS)}")
+	parser.add_argument("--ocr_tiered", action="store_true", help="Two passes: one quick attempt per image first (a provisional catalog is written after it), then the full search only for images missing an article, colour, size or pair")
+	parser.add_argument("--memory_limit", type=int, default=int(os.environ.get("OCR_MEMORY_LIMIT_MB") or 0), help="RSS ceiling in MiB for the run, workers included: work is held back near it and products are streamed instead of held (0 = off; default from OCR_MEMORY_LIMIT_MB)")
+	parser.add_argument("--no_roi", action="store_true", help="OCR the full frame only, without first trying the detected text label")
+	parser.add_argument("--ocr_cache", choices=["dir", "sqlite"], default="dir", help="OCR cache layout: one JSON file per image in out_dir/ocr, or a single out_dir/ocr.sqlite (imported from out_dir/ocr on first use)")
+	parser.add_argument("--timing_report", action="store_true", help="Write per-image, per-stage OCR timings and every approach/PSM attempt to out_dir/ocr_timing.json (summary included) and ocr_timing.csv")
+	parser.add_argument("--stream", action="store_true", help="Match and write each product as soon as it is OCR'd instead of after the whole folder (rows arrive in completion order)")
+	parser.add_argument("--watch", action="store_true", help="After the first build, keep watching images_dir and the rate list and update the catalog as files change")
+	parser.add_argument("--poll_interval", type=float, default=2.0, help="Seconds between folder checks in --watch mode (the only change detection when watchdog is not installed)")
 	args = parser.parse_args()
+	approaches = [name.strip() for name in args.ocr_approaches.split(",")] if args.ocr_approaches else None
+	unknown = [name for name in approaches or [] if name not in VARIANTS]
+	if unknown:
+		parser.error(f"unknown --ocr_approaches: {', '.join(unknown)}")
 
 	ensure_dir(args.out_dir)
 	ocr_cache = os.path.join(args.out_dir, "ocr")
-	ensure_dir(ocr_cache)
+	if args.ocr_cache == "sqlite":
+		ocr_cache = open_sqlite_cache(args.out_dir)
+	else:
+		ensure_dir(ocr_cache)
 	thumb_dir = os.path.join(args.out_dir, "thumbs")
 	ensure_dir(thumb_dir)
 
+	options = OcrOptions(scoring=args.ocr_scoring, quality_bar=args.ocr_quality, engine=args.ocr_engine, roi=not args.no_roi, batch_size=args.ocr_batch, dedup=args.dedup, dedup_distance=args.dedup_distance, image_timeout=args.ocr_timeout, attempt_timeout=args.ocr_attempt_timeout, approaches=approaches, tiered=args.ocr_tiered, memory_limit_mb=args.memory_limit)
+	ocr_args = dict(force=args.force_ocr, workers=args.workers, options=options, stats_path=os.path.join(args.out_dir, "ocr_stats.json"))
+	if args.timing_report:
+		ocr_args["report_path"] = os.path.join(args.out_dir, "ocr_timing.json")
+	if args.watch:
+		CatalogWatcher(args.images_dir, args.rate_list, args.out_dir, ocr_cache, thumb_dir, ocr_args, poll_interval=args.poll_interval).run()
+		return
+	if args.stream or args.memory_limit:
+		# Streaming never holds the whole catalog, which a memory-bounded
+		# run over tens of thousands of photos cannot afford
+		run_streaming(args, ocr_cache, thumb_dir, ocr_args)
+		return
+
+	csv_path = os.path.join(args.out_dir, "catalog.csv")
+	html_path = os.path.join(args.out_dir, "catalog.html")
+	rates = None
+
+	def write_provisional(products):
+		# Tiered OCR: a usable catalog as soon as the fast pass is done
+		nonlocal rates
+		rates = rates if rates is not None else parse_rate_list(args.rate_list, rate_cache_path(args.out_dir), workers=args.workers)
+		matched = match_products_with_rates(products, rates)
+		write_csv(matched, csv_path)
+		write_html(matched, html_path)
+		print(f"  Provisional catalog written ({len(matched)} products): {csv_path}")
+
 	print("[1/4] OCR images ...")
-	products = ocr_images_to_products(args.images_dir, ocr_cache, thumb_dir, force=args.force_ocr)
+	products = ocr_images_to_products(args.images_dir, ocr_cache, thumb_dir, on_fast_pass=write_provisional, **ocr_args)
 	print(f"  OCR items: {len(products)}")
 
 	print("[2/4] Parse rate list ...")
-	rates = parse_rate_list(args.rate_list)
+	rates = rates if rates is not None else parse_rate_list(args.rate_list, rate_cache_path(args.out_dir), workers=args.workers)
 	print(f"  Rate rows: {len(rates)}")
 
 	print("[3/4] Match ...")
@@ -37,13 +108,39 @@ def main():
 	print(f"  Matched: {sum(1 for m in matched if m.get('matched'))} / {len(matched)}")
 
 	print("[4/4] Write outputs ...")
-	csv_path = os.path.join(args.out_dir, "catalog.csv")
-	html_path = os.path.join(args.out_dir, "catalog.html")
 	write_csv(matched, csv_path)
 	write_html(matched, html_path)
 	print("Done:", csv_path, html_path)
 
 
+def run_streaming(args, ocr_cache: str, thumb_dir: str, ocr_args: dict) -> None:
+	# The rate list is parsed first so that every product can be matched and
+	# written the moment OCR yields it; only the current product is in memory.
+	# The HTML page needs every product, so it is built from catalog.jsonl at
+	# the end, again one record at a time.
+	print("[1/3] Parse rate list ...")
+	index = RateIndex(parse_rate_list(args.rate_list, rate_cache_path(args.out_dir), workers=args.workers))
+	print(f"  Rate rows: {len(index.rows)}")
+
+	print("[2/3] OCR, match and write ...")
+	csv_path = os.path.join(args.out_dir, "catalog.csv")
+	jsonl_path = os.path.join(args.out_dir, "catalog.jsonl")
+	html_path = os.path.join(args.out_dir, "catalog.html")
+	products = iter_ocr_products(args.images_dir, ocr_cache, thumb_dir, **ocr_args)
+	matched = 0
+	with CsvStreamWriter(csv_path) as csv_out, JsonlStreamWriter(jsonl_path) as jsonl_out:
+		for item in iter_match_products(products, index):
+			csv_out.write(item)
+			jsonl_out.write(item)
+			matched += bool(item.get("matched"))
+		total = csv_out.count
+	print(f"  Matched: {matched} / {total}")
+
+	print("[3/3] Write HTML ...")
+	write_html(read_jsonl(jsonl_path), html_path)
+	print("Done:", csv_path, jsonl_path, html_path)
+
+
 if __name__ == "__main__":
 	main()
 
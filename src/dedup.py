@@ -0,0 +1,85 @@
+from typing import Dict, List, Optional
+import numpy as np
+from PIL import Image
+
+# dHash grid: HASH_SIZE x HASH_SIZE horizontal gradient bits. 16 gives 256
+# bits, enough that two different articles shot the same way do not collide
+# the way they can with the classic 64-bit hash.
+HASH_SIZE = 16
+
+# Photos at most this many bits apart count as the same photo. Re-sent
+# WhatsApp copies are recompressed and sometimes rescaled, which flips a few
+# bits; a different shoe or label moves dozens.
+DEFAULT_MAX_DISTANCE = 12
+
+# Set bits per byte value, for Hamming distances over packed hashes
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint16)
+
+
+def dhash(path: str, size: int = HASH_SIZE) -> str:
+	"""Difference hash of the image at ``path`` as a hex string.
+
+	The image is shrunk to (size + 1) x size grey pixels and each bit says
+	whether a pixel is brighter than its left neighbour. JPEGs are decoded
+	with draft(), so this costs a few milliseconds even for large photos.
+	"""
+	with Image.open(path) as img:
+		img.draft("L", (size * 8, size * 8))
+		small = img.convert("L").resize((size + 1, size), Image.BILINEAR)
+	px = np.asarray(small, dtype=np.int16)
+	bits = px[:, 1:] > px[:, :-1]
+	return np.packbits(bits.flatten()).tobytes().hex()
+
+
+def _packed(hashes: List[str]) -> np.ndarray:
+	return np.array([np.frombuffer(bytes.fromhex(h), dtype=np.uint8) for h in hashes])
+
+
+class _UnionFind:
+	def __init__(self, items: List[str]):
+		self.parent = {item: item for item in items}
+
+	def find(self, item: str) -> str:
+		root = item
+		while self.parent[root] != root:
+			root = self.parent[root]
+		while self.parent[item] != root:
+			self.parent[item], item = root, self.parent[item]
+		return root
+
+	def union(self, a: str, b: str) -> None:
+		ra, rb = self.find(a), self.find(b)
+		if ra != rb:
+			self.parent[rb] = ra
+
+
+def cluster(new: Dict[str, str], known: Optional[Dict[str, str]] = None, max_distance: int = DEFAULT_MAX_DISTANCE) -> List[List[str]]:
+	"""Group near-duplicate images.
+
+	``new`` and ``known`` map file names to dhash() values. Every new image is
+	compared against every new and known image (known images are not compared
+	with each other, they were clustered when they were new). Returns the
+	clusters that contain at least one new image and more than one member.
+	"""
+	if not new:
+		return []
+	# Hashes recorded with another HASH_SIZE cannot be compared
+	width = len(next(iter(new.values())))
+	known = {k: v for k, v in (known or {}).items() if k not in new and len(v) == width}
+	names = list(new) + list(known)
+	if len(names) < 2:
+		return []
+	packed = _packed([new[n] for n in new] + [known[n] for n in known])
+	uf = _UnionFind(names)
+	for i in range(len(new)):
+		# Each new image against everything after it, one vectorised row
+		rest = packed[i + 1:]
+		if not len(rest):
+			break
+		distances = _POPCOUNT[np.bitwise_xor(rest, packed[i])].sum(axis=1)
+		for j in np.nonzero(distances <= max_distance)[0]:
+			uf.union(names[i], names[i + 1 + j])
+	groups: Dict[str, List[str]] = {}
+	for name in names:
+		groups.setdefault(uf.find(name), []).append(name)
+	return [members for members in groups.values() if len(members) > 1 and any(m in new for m in members)]
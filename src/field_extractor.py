@@ -0,0 +1,392 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+# Field extraction for the OCR'd product labels ("Article:-Sketch-03 / Colour /
+# Size / Poir"). Every rule is declared once below as data and compiled at
+# import time. Rules are still tried in priority order, first hit wins, exactly
+# like the original cascade, but each carries the literal(s) that must appear in
+# the text for it to match, which lets the extractor skip almost every regex
+# with a plain substring test.
+
+# A value after a label, up to the next separator
+_VALUE = r'([^,\n\r|]+?)(?:\s*[|\s]|$)'
+# The tail of a series name such as "Sketch-03 sid"
+_TAIL = r'[^,\n\r|]*?(?:\s*[|\s]|$)'
+
+# Series names printed with a dash and/or a space before the number
+_DASH_AND_SPACE_SERIES = ("runner", "mukeson")
+_DASH_SERIES = ("safari", "sofari")  # "sofari" is a common OCR error for safari
+_SPACE_SERIES = ("trk", "thar", "ford", "dizire", "ninja", "jaguar", "crv", "fista", "champ")
+
+_COLOUR_NAMES = ("navy", "black", "white", "grey", "gray", "blue", "red", "green", "yellow", "brown", "pink", "purple", "orange", "tan", "mhd", "brn", "mouse")
+_MULTI_COLOURS = ("white/green", "white/gray", "white/blue", "navy/orange", "d.gray", "l.gray", "t.blue")
+
+# Vocabularies used by the fallbacks, each in the order it is searched
+_FALLBACK_COLOUR_WORDS = ("black", "white", "grey", "gray", "blue", "red", "green", "yellow", "brown", "pink", "purple", "orange", "t.blue", "t-blue", "g.grey", "l.grey")
+_COLOUR_HINTS = ("blue", "grey", "black", "white", "red", "green", "yellow", "brown", "pink", "purple", "orange")
+_COLOUR_KEYWORDS = ("black", "white", "grey", "gray", "blue", "red", "green", "yellow", "brown", "pink", "purple", "orange", "tan", "navy", "sky")
+_ARTICLE_HINTS = ("sketch", "article", "item", "product")
+# Words that are never taken as a last-resort article name. Note "gray" is not
+# in these two lists; it is only searched for as a colour.
+_NOT_AN_ARTICLE = frozenset(("size", "pair", "colour", "color", "article", "sketch", "runner", "mukeson", "safari", "blue", "grey", "black", "white", "red", "green", "yellow", "brown", "pink", "purple", "orange", "tan", "navy", "sky"))
+_COLOUR_IN_WORD = ("blue", "grey", "black", "white", "red", "green", "yellow", "brown", "pink", "purple", "orange", "tan", "navy", "sky")
+
+# The only characters that survive lower() yet still match an ASCII letter
+# under re.IGNORECASE (long s and dotless i). Literal pre-checks are exact
+# whenever the text contains neither.
+_CASE_TWINS = ("\u017f", "\u0131")
+
+# A rule is (pattern, required literal or any-of tuple of literals, is_rocks)
+_Rule = Tuple[str, Union[str, Tuple[str, ...], None], bool]
+
+
+def _article_rules() -> List[_Rule]:
+	rules: List[_Rule] = [
+		# Standard patterns with colon
+		(r'article:\s*-?' + _VALUE, 'article:', False),
+		(r'aaticle:\s*-?' + _VALUE, 'aaticle:', False),
+		(r'article[^:]*:\s*-?' + _VALUE, 'article', False),
+		# Garbled article labels with colon: "ticle:-Runner-04", "Art:-Sktch 7"
+		(r'ticle:\s*-?' + _VALUE, 'ticle:', False),
+		(r'articl:\s*-?' + _VALUE, 'articl:', False),
+		(r'aticl:\s*-?' + _VALUE, 'aticl:', False),
+		(r'art:\s*-?' + _VALUE, 'art:', False),
+		# Dash separator without colon: "— Aaticle-Sketch-07 sid"
+		(r'aaticle\s*-' + _VALUE, 'aaticle', False),
+		(r'art\s*-' + _VALUE, 'art', False),
+		(r'article\s*-' + _VALUE, 'article', False),
+		# Sketch anywhere in the text, "Sketch 14", "Art-Sktch 7"
+		(r'sketch-\d+' + _TAIL, 'sketch-', False),
+		(r'sketch\s*-\s*\d+' + _TAIL, 'sketch', False),
+		(r'sketch\s+\d+' + _TAIL, 'sketch', False),
+		(r'sktch\s*-\s*\d+' + _TAIL, 'sktch', False),
+		(r'sktch\s+\d+' + _TAIL, 'sktch', False),
+		# Article-like labels without colon
+		(r'(?:^|\s)(article|aaticle|ticle|articl|aticl|art)\s+-?' + _VALUE, ('art', 'ticl'), False),
+		(r'(?:^|\s)(sketch-\d+[^,\n\r|]*?)(?:\s*[|\s]|$)', 'sketch-', False),
+		(r'(?:^|\s)(sketch\s+\d+[^,\n\r|]*?)(?:\s*[|\s]|$)', 'sketch', False),
+		(r'(?:^|\s)(sktch\s*\d+[^,\n\r|]*?)(?:\s*[|\s]|$)', 'sktch', False),
+	]
+	for name in _DASH_AND_SPACE_SERIES:
+		rules.append((name + r'-\d+' + _TAIL, name + '-', False))
+		rules.append((name + r'\s+\d+' + _TAIL, name, False))
+	for name in _DASH_SERIES:
+		rules.append((name + r'-\d+' + _TAIL, name + '-', False))
+	rules += [
+		# "Rocks 12", "Art-Rocks 12", "Rocks"
+		(r'rocks\s+(\d+)', 'rocks', True),
+		(r'art\s*-rocks\s+(\d+)', 'rocks', True),
+		(r'rocks\s*(\d*)', 'rocks', True),
+	]
+	for name in _SPACE_SERIES:
+		rules.append((name + r'\s+\d+' + _TAIL, name, False))
+	return rules
+
+
+_COLOUR_RULES: List[_Rule] = [
+	# Standard patterns with colon
+	(r'colour:\s*-?' + _VALUE, 'colour:', False),
+	(r'color:\s*-?' + _VALUE, 'color:', False),
+	(r'col[^:]*:\s*-?' + _VALUE, 'col', False),
+	# Garbled colour labels: "Col-Wt/Tan", "Col-Wt/Bk"
+	(r'col-[^:]*:\s*-?' + _VALUE, 'col-', False),
+	(r'col\s*-\s*-?' + _VALUE, 'col', False),
+	(r'col\s*-' + _VALUE, 'col', False),
+	(r'colour\s*-' + _VALUE, 'colour', False),
+	# Colour labels without colon
+	(r'(?:^|\s)(colour|color|col)\s+-?' + _VALUE, 'col', False),
+	(r'(?:^|\s)(col-[^,\n\r|]+?)(?:\s*[|\s]|$)', 'col-', False),
+	# Colour-looking values: "t.blue", "black/grey", "D.Gray", "wt/tan"
+	(r'(?:^|\s)([a-z]+(?:\.|/)[a-z]+(?:\.[a-z]+)?)(?:\s*[|\s]|$)', ('.', '/'), False),
+	(r'(?:^|\s)([a-z]+-[a-z]+(?:/[a-z]+)?)(?:\s*[|\s]|$)', '-', False),
+	# Standalone and multi-colour names
+	(r'(?:^|\s)(' + '|'.join(_COLOUR_NAMES) + r')(?:\s*[|\s]|$)', _COLOUR_NAMES, False),
+	(r'(?:^|\s)(' + '|'.join(re.escape(c) for c in _MULTI_COLOURS) + r')(?:\s*[|\s]|$)', _MULTI_COLOURS, False),
+]
+
+_SIZE_RULES: List[_Rule] = [
+	# Direct sizes anywhere in the text, multi-part first: "6x9 7x10", "6*9 7*10", "6/9-7/10"
+	(r'(\d+x\d+(?:\s+\d+x\d+)*)', 'x', False),
+	(r'(\d+\*\d+(?:\s+\d+\*\d+)*)', '*', False),
+	(r'(\d+/\d+(?:-\d+/\d+)*)', '/', False),
+	(r'(\d+x\d+)', 'x', False),
+	(r'(\d+\*\d+)', '*', False),
+	(r'(\d+/\d+)', '/', False),
+	# Size labels with colon, including "Stze:-6x9 7x10" and a partial "se"
+	(r'size:\s*-?' + _VALUE, 'size:', False),
+	(r'stze:\s*-?' + _VALUE, 'stze:', False),
+	(r'ize[^:]*:\s*-?' + _VALUE, 'ize', False),
+	(r'se[^:]*:\s*-?' + _VALUE, 'se', False),
+	# Dash separator
+	(r'size\s*-' + _VALUE, 'size', False),
+	(r'stze\s*-' + _VALUE, 'stze', False),
+	# Size labels without colon
+	(r'(?:^|\s)(size|stze|ize|se)\s+-?' + _VALUE, ('ize', 'stze', 'se'), False),
+]
+
+_PAIR_RULES: List[_Rule] = [
+	# Labels with colon, including OCR errors "poir" and "paie"
+	(r'pair[^:]*:\s*-?' + _VALUE, 'pair', False),
+	(r'poir[^:]*:\s*-?' + _VALUE, 'poir', False),
+	(r'pairs[^:]*:\s*-?' + _VALUE, 'pairs', False),
+	(r'air[^:]*:\s*-?' + _VALUE, 'air', False),
+	(r'paie[^:]*:\s*-?' + _VALUE, 'paie', False),
+	# Dash separator
+	(r'pair\s*-' + _VALUE, 'pair', False),
+	(r'poir\s*-' + _VALUE, 'poir', False),
+	# Labels without colon
+	(r'(?:^|\s)(pair|poir|pairs|air|paie)\s+-?' + _VALUE, ('air', 'poir', 'paie'), False),
+	(r'citi\s+pair\s+(\d+)', 'citi', False),
+	# All of our articles come in pairs of 24
+	(r'(\b24\b)', '24', False),
+]
+
+
+def _compile(rules: Sequence[_Rule]):
+	compiled = []
+	for pattern, literal, is_rocks in rules:
+		if isinstance(literal, str):
+			literal = (literal,)
+		regex = re.compile(pattern, re.IGNORECASE)
+		compiled.append((regex, literal, is_rocks, regex.groups))
+	return compiled
+
+
+_ARTICLE = _compile(_article_rules())
+_COLOUR = _compile(_COLOUR_RULES)
+_SIZE = _compile(_SIZE_RULES)
+_PAIR = _compile(_PAIR_RULES)
+
+_LEADING_DASHES = re.compile(r'^-+')
+_ARTICLE_GARBAGE = re.compile(r'[^a-zA-Z0-9\-_\s].*$')
+_COLOUR_GARBAGE = re.compile(r'[^a-zA-Z0-9\-/\.\s].*$')
+_SIZE_GARBAGE = re.compile(r'[^a-zA-Z0-9\-/x\.\s].*$')
+_PAIR_GARBAGE = re.compile(r'[^a-zA-Z0-9\-\.\s].*$')
+_SIZE_TRAILING_WORDS = re.compile(r'\s+(poir|pairs?|air|ss|ui|ag|wa).*$', re.IGNORECASE)
+_ROCKS = re.compile(r'rocks\s*(\d*)', re.IGNORECASE)
+
+_SKETCH_ANYWHERE = re.compile(r'sketch-\d+[^,\n\r]*', re.IGNORECASE)
+_ARTICLE_LIKE = [re.compile(p, re.IGNORECASE) for p in (r'([a-z]+-\d+)', r'([a-z]+\d+)', r'(\d+[a-z]+)')]
+_COLOUR_CONTEXT = [(word, re.compile(r'[^,\n\r]*' + word + r'[^,\n\r]*', re.IGNORECASE)) for word in _FALLBACK_COLOUR_WORDS]
+_COLOUR_LIKE = [re.compile(p, re.IGNORECASE) for p in (r'([a-z]\.?[a-z]+)', r'([a-z]+/[a-z]+)', r'([a-z]+-[a-z]+)')]
+_SIZE_ANYWHERE = re.compile(r'\d+x\d+')
+_SIZE_LIKE = [re.compile(p) for p in (r'\d+x\d+', r'\d+/\d+', r'\d+-\d+')]
+_PAIR_NUMBERS = [re.compile(p) for p in (r'(?:^|\s)(\d{1,2})(?:\s*[|\s]|$)', r'(\b\d{1,2}\b)')]
+_WORDS = re.compile(r'\b[a-zA-Z]+\b')
+_SIZE_WORD = [re.compile(p) for p in (r'^\d+x\d+$', r'^\d+/\d+$', r'^\d+-\d+$')]
+
+_FINAL_CLEANUP = {
+	"article": (re.compile(r'^[^a-zA-Z0-9\-]*'), _ARTICLE_GARBAGE),
+	"colour": (re.compile(r'^[^a-zA-Z0-9\-/]*'), _COLOUR_GARBAGE),
+	"size": (re.compile(r'^[^a-zA-Z0-9\-/x]*'), _SIZE_GARBAGE),
+	"pair": (re.compile(r'^[^a-zA-Z0-9\-]*'), _PAIR_GARBAGE),
+}
+
+
+class _Text:
+	# The OCR text, normalised once and shared by every rule
+
+	def __init__(self, text: str):
+		self.lines = [l.strip() for l in text.splitlines() if l.strip()]
+		self.full = " ".join(self.lines)
+		self.lower = self.full.lower()
+		# Case-insensitive regex matching and plain lower-casing agree on
+		# ASCII, so str.find can stand in for a regex search there
+		self.ascii = self.full.isascii()
+		self.literal_safe = self.ascii or not any(c in self.lower for c in _CASE_TWINS)
+
+	def may_match(self, literals: Tuple[str, ...]) -> bool:
+		return not self.literal_safe or any(lit in self.lower for lit in literals)
+
+	def original_case(self, value: str) -> str:
+		# The first case-insensitive occurrence of value in the original text
+		if self.ascii:
+			idx = self.lower.find(value.lower())
+			return self.full[idx:idx + len(value)] if idx >= 0 else value
+		match = re.search(re.escape(value), self.full, re.IGNORECASE)
+		return match.group(0) if match else value
+
+
+def _first_rule(text: _Text, rules, clean, min_len: int):
+	# Try each rule in order; the first cleaned value longer than min_len wins.
+	# Like the original cascade, a rejected value is still what the field holds
+	# if no later rule succeeds.
+	value = None
+	for regex, literals, is_rocks, groups in rules:
+		if not text.may_match(literals):
+			continue
+		match = regex.search(text.lower)
+		if not match:
+			continue
+		if groups > 1:
+			value = match.group(2).strip()
+		else:
+			value = match.group(1) if groups else match.group(0)
+		value = clean(value)
+		if value and len(value) > min_len:
+			if is_rocks:
+				# Rebuild the full "Rocks 12" name, in its original case
+				rocks = _ROCKS.search(text.lower)
+				if rocks:
+					value = f"Rocks {rocks.group(1)}" if rocks.group(1) else "Rocks"
+				rocks = _ROCKS.search(text.full)
+				if rocks and rocks.group(0):
+					value = rocks.group(0)
+			else:
+				value = text.original_case(value)
+			return value, True
+	return value, False
+
+
+def _clean_article(value: str) -> str:
+	value = value.strip().replace("— ", "").replace("aaticle", "article")
+	value = _LEADING_DASHES.sub('', value)
+	return _ARTICLE_GARBAGE.sub('', value).strip()
+
+
+def _clean_colour(value: str) -> str:
+	value = _LEADING_DASHES.sub('', value.strip())
+	return _COLOUR_GARBAGE.sub('', value).strip()
+
+
+def _clean_size(value: str) -> str:
+	value = value.strip().replace("stze", "size").replace("ize", "size")
+	value = _LEADING_DASHES.sub('', value)
+	value = _SIZE_TRAILING_WORDS.sub('', value)
+	return _SIZE_GARBAGE.sub('', value).strip()
+
+
+def _clean_pair(value: str) -> str:
+	value = value.strip().replace("poir", "pair").replace("air", "pair").replace("paie", "pair")
+	value = _LEADING_DASHES.sub('', value)
+	return _PAIR_GARBAGE.sub('', value).strip()
+
+
+def _fallback_article(text: _Text, article):
+	match = _SKETCH_ANYWHERE.search(text.lower)
+	if match:
+		article = text.original_case(_ARTICLE_GARBAGE.sub('', match.group(0).strip()))
+	if not article:
+		for regex in _ARTICLE_LIKE:
+			match = regex.search(text.lower)
+			if match:
+				candidate = match.group(1).strip()
+				if len(candidate) > 3 and any(word in candidate.lower() for word in _ARTICLE_HINTS):
+					return text.original_case(candidate)
+	return article
+
+
+def _fallback_colour(text: _Text, colour):
+	for word, regex in _COLOUR_CONTEXT:
+		if word in text.lower:
+			match = regex.search(text.full)
+			if match:
+				colour = _COLOUR_GARBAGE.sub('', match.group(0).strip())
+				break
+	if not colour:
+		for regex in _COLOUR_LIKE:
+			match = regex.search(text.lower)
+			if match:
+				candidate = match.group(1).strip()
+				if len(candidate) > 2 and any(c in candidate.lower() for c in _COLOUR_HINTS):
+					return text.original_case(candidate)
+	return colour
+
+
+def _fallback_pair(text: _Text) -> str:
+	# Prefer 24, the pair count of nearly every article, then any plausible
+	# number (e.g. 16 for Dizire 03), then assume 24
+	if '24' in text.lower:
+		return "24"
+	for regex in _PAIR_NUMBERS:
+		for number in regex.findall(text.lower):
+			if number.isdigit() and 1 <= int(number) <= 50:
+				return text.original_case(number)
+	return "24"
+
+
+def _last_resort_article(text: _Text) -> Optional[str]:
+	for word in _WORDS.findall(text.lower):
+		if (len(word) > 3 and
+			word.lower() not in _NOT_AN_ARTICLE and
+			not any(colour in word.lower() for colour in _COLOUR_IN_WORD) and
+			not any(regex.match(word) for regex in _SIZE_WORD)):
+			return text.original_case(word)
+	return None
+
+
+def _last_resort_colour(text: _Text) -> Optional[str]:
+	for colour in _COLOUR_KEYWORDS:
+		if colour in text.lower:
+			return text.original_case(colour)
+	return None
+
+
+def _last_resort_size(text: _Text) -> Optional[str]:
+	for regex in _SIZE_LIKE:
+		match = regex.search(text.lower)
+		if match:
+			return text.original_case(match.group(0))
+	return None
+
+
+def _final_cleanup(name: str, value):
+	if not value:
+		return value
+	leading, trailing = _FINAL_CLEANUP[name]
+	value = _LEADING_DASHES.sub('', value)
+	value = leading.sub('', value)
+	return trailing.sub('', value).strip()
+
+
+def extract_fields(raw_text: str) -> Dict:
+	text = _Text(raw_text)
+
+	article, _ = _first_rule(text, _ARTICLE, _clean_article, 2)
+	colour, _ = _first_rule(text, _COLOUR, _clean_colour, 1)
+	size, _ = _first_rule(text, _SIZE, _clean_size, 1)
+	pair, _ = _first_rule(text, _PAIR, _clean_pair, 0)
+
+	# Fallbacks for labels the rules above could not read
+	if not article:
+		article = _fallback_article(text, article)
+	if not colour:
+		colour = _fallback_colour(text, colour)
+	if not size:
+		match = _SIZE_ANYWHERE.search(text.lower)
+		if match:
+			size = text.original_case(match.group(0))
+	if not pair:
+		pair = _fallback_pair(text)
+
+	# Last resort for very poor OCR text: take anything that looks like data
+	if text.full:
+		if not article:
+			article = _last_resort_article(text) or article
+		if not colour:
+			colour = _last_resort_colour(text) or colour
+		if not size:
+			size = _last_resort_size(text) or size
+
+	article = _final_cleanup("article", article)
+	colour = _final_cleanup("colour", colour)
+	size = _final_cleanup("size", size)
+	pair = _final_cleanup("pair", pair)
+
+	# Description is whatever is left once the extracted values are removed
+	needles = [v.lower() for v in (article, colour, size, pair) if v]
+	desc_lines = [
+		line for line in text.lines
+		if len(line) > 2 and not any(n in line.lower() for n in needles)
+	]
+	description = " ".join(desc_lines) if desc_lines else None
+
+	return {
+		"article": article,
+		"colour": colour,
+		"size": size,
+		"pair": pair,
+		"name": article,  # Keep for backward compatibility
+		"description": description,
+		"raw_text": raw_text,
+	}
@@ -1,27 +1,36 @@
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
 from rapidfuzz import fuzz, process
 
 
-def _best_match(name: Optional[str], rate_rows: List[Dict]) -> Dict:
-	if not name:
-		return {"matched": False}
-	choices = [(r.get("raw") or " ", r) for r in rate_rows]
-	if not choices:
-		return {"matched": False}
-	best = process.extractOne(name, [c[0] for c in choices], scorer=fuzz.WRatio)
-	if not best:
-		return {"matched": False}
-	score, idx = best[1], best[2]
-	row = choices[idx][1]
-	return {"matched": score >= 70, "score": score, "rate_row": row}
+class RateIndex:
+	"""The rate rows prepared once for repeated fuzzy lookups.
 
+	Built a single time per rate list, so matching a product does not rebuild
+	the list of choices on every call.
+	"""
 
-def match_products_with_rates(products: List[Dict], rates: List[Dict]) -> List[Dict]:
-	matched: List[Dict] = []
+	def __init__(self, rate_rows: List[Dict]):
+		self.rows = list(rate_rows)
+		self.choices = [r.get("raw") or " " for r in self.rows]
+
+	def best_match(self, name: Optional[str]) -> Dict:
+		if not name or not self.choices:
+			return {"matched": False}
+		best = process.extractOne(name, self.choices, scorer=fuzz.WRatio)
+		if not best:
+			return {"matched": False}
+		score, idx = best[1], best[2]
+		row = self.rows[idx]
+		return {"matched": score >= 70, "score": score, "rate_row": row}
+
+
+def iter_match_products(products: Iterable[Dict], rates) -> Iterator[Dict]:
+	# Consumes products one at a time, so it can sit directly behind
+	# iter_ocr_products. ``rates`` is a RateIndex or a list of rate rows.
+	index = rates if isinstance(rates, RateIndex) else RateIndex(rates)
 	for p in products:
-		res = _best_match(p.get("name"), rates)
-		combined = {**p, **res}
-		matched.append(combined)
-	return matched
+		yield {**p, **index.best_match(p.get("name"))}
 
 
+def match_products_with_rates(products: List[Dict], rates: List[Dict]) -> List[Dict]:
+	return list(iter_match_products(products, rates))
@@ -0,0 +1,145 @@
+import ctypes
+import ctypes.util
+import gc
+import os
+import time
+from typing import Dict, List, Optional
+try:
+	import psutil
+except ImportError:
+	psutil = None
+
+# Memory-bounded runs hold back new OCR work once the run (this process,
+# its workers and their tesseract processes) uses this fraction of the
+# ceiling, and let it flow again below it
+_SOFT_FRACTION = 0.85
+
+# How long an RSS sample is reused; reading /proc for a process tree costs
+# about a millisecond
+_SAMPLE_SECONDS = 0.5
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _libc():
+	# glibc's malloc_trim hands freed heap pages back to the kernel; without
+	# it RSS stays at its high-water mark after big image buffers are freed
+	name = ctypes.util.find_library("c")
+	try:
+		libc = ctypes.CDLL(name) if name else None
+	except OSError:
+		return None
+	return libc if libc is not None and hasattr(libc, "malloc_trim") else None
+
+
+_LIBC = _libc()
+
+
+def release_memory() -> None:
+	"""Free unreachable objects now and return free heap pages to the OS."""
+	gc.collect()
+	if _LIBC is not None:
+		_LIBC.malloc_trim(0)
+
+
+def _proc_rss_mb(pid: int) -> Optional[float]:
+	try:
+		with open(f"/proc/{pid}/statm") as f:
+			return int(f.read().split()[1]) * _PAGE_SIZE / (1 << 20)
+	except (OSError, ValueError, IndexError):
+		return None
+
+
+def _proc_children() -> Dict[int, List[int]]:
+	# ppid -> pids, from one pass over /proc
+	children: Dict[int, List[int]] = {}
+	for name in os.listdir("/proc"):
+		if not name.isdigit():
+			continue
+		try:
+			with open(f"/proc/{name}/stat") as f:
+				# The command name may contain spaces, so split after it
+				ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+		except (OSError, ValueError, IndexError):
+			continue
+		children.setdefault(ppid, []).append(int(name))
+	return children
+
+
+def tree_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+	"""Resident memory of a process and all its descendants, in MiB.
+
+	Read from /proc on Linux, else through psutil when it is installed;
+	None when neither is available.
+	"""
+	pid = pid or os.getpid()
+	if os.path.exists(f"/proc/{pid}/statm"):
+		children = _proc_children()
+		total, stack = 0.0, [pid]
+		while stack:
+			current = stack.pop()
+			total += _proc_rss_mb(current) or 0.0
+			stack.extend(children.get(current, []))
+		return total
+	if psutil is not None:
+		try:
+			proc = psutil.Process(pid)
+			procs = [proc, *proc.children(recursive=True)]
+		except psutil.Error:
+			return None
+		total = 0.0
+		for p in procs:
+			try:
+				total += p.memory_info().rss / (1 << 20)
+			except psutil.Error:
+				pass
+		return total
+	return None
+
+
+class MemoryGovernor:
+	"""RSS ceiling for one OCR run, counting the process and its workers.
+
+	The pipeline asks ``window()`` how many jobs it may have in flight.
+	Below the soft limit (_SOFT_FRACTION of the ceiling) that is the normal
+	number; above it, no new jobs are handed out until running ones finish
+	and memory drops, so workers see backpressure instead of the machine
+	running out of memory. Without a way to measure RSS the governor never
+	holds anything back.
+	"""
+
+	def __init__(self, ceiling_mb: float):
+		self.ceiling_mb = ceiling_mb
+		self.soft_mb = ceiling_mb * _SOFT_FRACTION
+		self.peak_mb = 0.0
+		self.throttled = 0
+		self._sample: Optional[float] = None
+		self._sampled_at = 0.0
+
+	def usage_mb(self) -> Optional[float]:
+		now = time.monotonic()
+		if self._sample is None or now - self._sampled_at >= _SAMPLE_SECONDS:
+			self._sample = tree_rss_mb()
+			self._sampled_at = now
+			if self._sample is not None:
+				self.peak_mb = max(self.peak_mb, self._sample)
+		return self._sample
+
+	def near_ceiling(self) -> bool:
+		usage = self.usage_mb()
+		if usage is None or usage < self.soft_mb:
+			return False
+		# Give back what this process can before holding work back
+		release_memory()
+		self._sample = None
+		usage = self.usage_mb()
+		return usage is not None and usage >= self.soft_mb
+
+	def window(self, normal: int) -> int:
+		if self.near_ceiling():
+			self.throttled += 1
+			return 0
+		return normal
+
+	def summary(self) -> str:
+		return f"peak RSS {self.peak_mb:.0f} MiB of {self.ceiling_mb:.0f} MiB ceiling, held back new work {self.throttled} time(s)"
@@ -0,0 +1,200 @@
+import asyncio
+import io
+import os
+import shlex
+from dataclasses import replace
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from src.ocr_cache import open_cache_store, source_stamp
+from src.ocr_parser import (
+	_PSM_MODES, OcrOptions, OcrTimeout, SearchSteps,
+	_iter_cached, _ocr_fingerprint, _record_outcome, _search_image, _store_result,
+	_tsv_to_data, list_images,
+)
+from src.ocr_stats import OcrStats
+from src.tesseract import tesseract_cmd
+from src.thumbs import generate_thumbnails, relative_thumb_paths
+
+# Each tesseract process gets one OpenMP thread: with one process per core,
+# tesseract's own threads would only fight over the same cores
+_TESSERACT_ENV = {**os.environ, "OMP_THREAD_LIMIT": "1"}
+
+
+def _encode(image) -> bytes:
+	# What goes down tesseract's stdin: a file's own bytes, or a PIL image as
+	# PNG (lossless, and compress_level 1 keeps the encode cheap)
+	if isinstance(image, bytes):
+		return image
+	if isinstance(image, str):
+		with open(image, "rb") as f:
+			return f.read()
+	buf = io.BytesIO()
+	image.save(buf, "PNG", compress_level=1)
+	return buf.getvalue()
+
+
+class AsyncTesseract:
+	"""tesseract run through asyncio subprocesses, with image bytes fed over stdin.
+
+	At most ``concurrency`` tesseract processes run at once (default: one per
+	CPU core), however many searches share this instance, so one instance can
+	serve a whole service process. Answers the OcrRequests the search in
+	src/ocr_parser.py yields.
+	"""
+
+	def __init__(self, concurrency: int = 0, cmd: Optional[str] = None):
+		self.cmd = cmd or tesseract_cmd()
+		self.concurrency = concurrency or os.cpu_count() or 1
+		self._semaphore: Optional[asyncio.Semaphore] = None
+
+	@property
+	def semaphore(self) -> asyncio.Semaphore:
+		# Created on first use, inside the running event loop
+		if self._semaphore is None:
+			self._semaphore = asyncio.Semaphore(self.concurrency)
+		return self._semaphore
+
+	async def run(self, kind: str, image, config: str, timeout: float = 0):
+		# image_to_data() dict for kind "data", else the plain text. image may
+		# already be encoded (bytes); anything else is encoded here, on the loop.
+		data = _encode(image)
+		args = [self.cmd, "stdin", "stdout", *shlex.split(config)]
+		if kind == "data":
+			args.append("tsv")
+		async with self.semaphore:
+			proc = await asyncio.create_subprocess_exec(
+				*args, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+				stderr=asyncio.subprocess.PIPE, env=_TESSERACT_ENV,
+			)
+			try:
+				out, err = await asyncio.wait_for(proc.communicate(data), timeout or None)
+			except asyncio.TimeoutError:
+				raise OcrTimeout(f"tesseract timed out after {timeout:.1f}s") from None
+			finally:
+				# Timed out or cancelled: do not leave tesseract running
+				if proc.returncode is None:
+					proc.kill()
+					await proc.wait()
+		if proc.returncode != 0:
+			raise RuntimeError(f"tesseract failed ({proc.returncode}): {err.decode('utf-8', errors='replace').strip()}")
+		text = out.decode("utf-8", errors="replace")
+		return _tsv_to_data(text) if kind == "data" else text
+
+
+def _advance(steps: SearchSteps, result=None, error: Optional[BaseException] = None) -> Tuple[Optional[tuple], Optional[Dict]]:
+	# One step of the search: (next request, None), or (None, outcome) once it
+	# is done; StopIteration itself cannot be passed through an asyncio future
+	try:
+		request = steps.throw(error) if error is not None else steps.send(result)
+	except StopIteration as stop:
+		return None, stop.value
+	return request, None
+
+
+async def _drive_async(steps: SearchSteps, tesseract: AsyncTesseract) -> Dict:
+	# The asyncio counterpart of src.ocr_parser._drive. The search's own work
+	# between tesseract calls (decoding, label detection, preprocessing) and
+	# the PNG encoding run in the loop's default thread pool, so the loop only
+	# waits. Each image is encoded once, however many PSMs are tried on it;
+	# the encoded entries keep their image referenced, so ids stay unique.
+	loop = asyncio.get_running_loop()
+	encoded: Dict[object, Tuple[object, bytes]] = {}
+
+	async def encode(image) -> bytes:
+		key = image if isinstance(image, str) else id(image)
+		if key not in encoded:
+			encoded[key] = (image, await loop.run_in_executor(None, _encode, image))
+		return encoded[key][1]
+
+	try:
+		request, outcome = await loop.run_in_executor(None, _advance, steps)
+		while request is not None:
+			kind, image, config, timeout = request
+			try:
+				result = await tesseract.run(kind, await encode(image), config, timeout)
+			except Exception as e:
+				request, outcome = await loop.run_in_executor(None, _advance, steps, None, e)
+			else:
+				request, outcome = await loop.run_in_executor(None, _advance, steps, result)
+		return outcome
+	finally:
+		encoded.clear()
+		try:
+			steps.close()
+		except ValueError:
+			# Cancelled while a step was running in the pool: the generator
+			# is closed when it is garbage collected after that step
+			pass
+
+
+async def _process_image_async(tesseract: AsyncTesseract, fname: str, images_dir: str, cache_dir: str, thumb_dir: str, ocr_fingerprint: str, options: OcrOptions) -> Dict:
+	# Hashing the file and parsing and storing the result are blocking work
+	# too, so they also go to the thread pool
+	loop = asyncio.get_running_loop()
+	img_path = os.path.join(images_dir, fname)
+	stamp = await loop.run_in_executor(None, source_stamp, img_path)
+	outcome = await _drive_async(_search_image(img_path, options), tesseract)
+	return await loop.run_in_executor(None, _store_result, fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, stamp, outcome)
+
+
+async def aiter_ocr_products(images_dir: str, cache_dir: str, thumb_dir: str, force: bool = False, options: Optional[OcrOptions] = None, stats_path: Optional[str] = None, fnames: Optional[List[str]] = None, tesseract: Optional[AsyncTesseract] = None) -> AsyncIterator[Dict]:
+	"""Async counterpart of iter_ocr_products, for use inside an event loop.
+
+	Cache hits come first, then OCR results in completion order. The search
+	per image is the same as in the blocking pipeline (including the learned
+	order, ROI, time limits and the cache), but tesseract runs in asyncio
+	subprocesses, so OCR needs no worker processes. Hashing, decoding,
+	preprocessing and PNG encoding run in the loop's default thread pool, so
+	the loop stays responsive throughout. Pass a shared AsyncTesseract to cap concurrency
+	across several callers; by default one process per CPU core. As many
+	images as that are in flight at once. The batch_size, dedup and tiered
+	options are not used here.
+	"""
+	options = options or OcrOptions()
+	tesseract = tesseract or AsyncTesseract()
+	stats = OcrStats(stats_path)
+	fnames = list_images(images_dir) if fnames is None else fnames
+	ocr_fingerprint = _ocr_fingerprint(options)
+	store = open_cache_store(cache_dir)
+	pending: List[str] = []
+	for fname, product in _iter_cached(fnames, images_dir, store, ocr_fingerprint, force, options, pending):
+		yield {**product, "thumbs": relative_thumb_paths(fname, thumb_dir)}
+
+	if pending:
+		print(f"  OCR needed for {len(pending)} of {len(fnames)} images")
+	options = replace(options, search_order=stats.search_order(options.approach_names(), _PSM_MODES))
+	queue = iter(pending)
+	running: Dict[asyncio.Task, str] = {}
+	try:
+		while True:
+			# Top up to one image per tesseract slot, so a big folder does not
+			# decode every image up front
+			while len(running) < tesseract.concurrency:
+				fname = next(queue, None)
+				if fname is None:
+					break
+				task = asyncio.ensure_future(_process_image_async(tesseract, fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, options))
+				running[task] = fname
+			if not running:
+				break
+			done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+			for task in done:
+				fname = running.pop(task)
+				try:
+					entry = task.result()
+				except Exception as e:
+					print(f"Warning: OCR failed for {fname}: {e}")
+					continue
+				yield {**_record_outcome(stats, fname, entry), "thumbs": relative_thumb_paths(fname, thumb_dir)}
+	finally:
+		# Also when the consumer stops early: no orphaned searches (waiting
+		# for the cancelled ones lets AsyncTesseract kill and reap their
+		# tesseract processes), and the wins learned so far are kept
+		for task in running:
+			task.cancel()
+		await asyncio.gather(*running, return_exceptions=True)
+		stats.save()
+
+	# Thumbnails are plain blocking work, so they go to the default executor
+	# rather than the loop; they are cached and cheap after the first run
+	loop = asyncio.get_running_loop()
+	await loop.run_in_executor(None, generate_thumbnails, images_dir, thumb_dir, fnames)
@@ -0,0 +1,251 @@
+import os
+import json
+import glob
+import sqlite3
+import hashlib
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+# Key under which cache bookkeeping is stored inside each OCR entry. It is
+# stripped before entries are handed to matching/output.
+META_KEY = "_cache"
+
+CACHE_HIT = "hit"
+CACHE_REPARSE = "reparse"
+CACHE_MISS = "miss"
+
+
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+	h = hashlib.sha256()
+	with open(path, "rb") as f:
+		for chunk in iter(lambda: f.read(chunk_size), b""):
+			h.update(chunk)
+	return h.hexdigest()
+
+
+def source_stamp(path: str, sha256: Optional[str] = None) -> Dict:
+	st = os.stat(path)
+	return {
+		"sha256": sha256 or file_sha256(path),
+		"size": st.st_size,
+		"mtime_ns": st.st_mtime_ns,
+	}
+
+
+def fingerprint(config) -> str:
+	blob = json.dumps(config, sort_keys=True, default=str).encode("utf-8")
+	return hashlib.sha256(blob).hexdigest()[:16]
+
+
+def load_entry(cache_path: str) -> Optional[Dict]:
+	try:
+		with open(cache_path, "r", encoding="utf-8") as f:
+			return json.load(f)
+	except Exception:
+		return None
+
+
+def write_json(path: str, data) -> None:
+	# Write to a temp file and rename so a crash mid-write never leaves a
+	# truncated file behind for the next run to trip over
+	tmp_path = f"{path}.{os.getpid()}.tmp"
+	try:
+		with open(tmp_path, "w", encoding="utf-8") as f:
+			json.dump(data, f, ensure_ascii=False, indent=2)
+		os.replace(tmp_path, path)
+	except Exception:
+		try:
+			os.remove(tmp_path)
+		except OSError:
+			pass
+
+
+def write_entry(cache_path: str, entry: Dict) -> None:
+	write_json(cache_path, entry)
+
+
+def strip_meta(entry: Dict) -> Dict:
+	return {k: v for k, v in entry.items() if k != META_KEY}
+
+
+def refresh_stamp(source: Optional[Dict], path: str) -> Tuple[bool, Optional[Dict]]:
+	"""Check a recorded source stamp against the file at ``path``.
+
+	Returns ``(unchanged, stamp)``. The file is only re-hashed when its size or
+	mtime differ from the record; ``stamp`` is the new stamp in that case (so
+	the caller can store it and skip hashing next time), else None.
+	"""
+	source = source or {}
+	try:
+		st = os.stat(path)
+	except OSError:
+		return False, None
+	if st.st_size == source.get("size") and st.st_mtime_ns == source.get("mtime_ns"):
+		return True, None
+	# File was touched: only the bytes decide whether it really changed
+	stamp = source_stamp(path)
+	return stamp["sha256"] == source.get("sha256"), stamp
+
+
+def check_entry(entry: Optional[Dict], img_path: str, ocr_fingerprint: str, parser_version: int) -> Tuple[str, Optional[Dict]]:
+	"""Decide whether a cached entry can be reused for ``img_path``.
+
+	Returns ``(status, stamp)`` where status is one of CACHE_HIT, CACHE_REPARSE
+	(the OCR text is still valid but the parser changed) or CACHE_MISS. ``stamp``
+	is the current source stamp when it had to be recomputed, so the caller can
+	refresh the entry and skip hashing next time.
+	"""
+	meta = (entry or {}).get(META_KEY)
+	if not meta or meta.get("ocr_fingerprint") != ocr_fingerprint:
+		return CACHE_MISS, None
+
+	unchanged, stamp = refresh_stamp(meta.get("source"), img_path)
+	if not unchanged:
+		return CACHE_MISS, stamp
+
+	if meta.get("parser_version") != parser_version:
+		return CACHE_REPARSE, stamp
+	return CACHE_HIT, stamp
+
+
+class DirCacheStore:
+	"""OCR cache as one pretty-printed JSON file per image, ``<stem>.json``.
+
+	Easy to inspect and diff, but a warm run opens and parses every file.
+	"""
+
+	def __init__(self, cache_dir: str):
+		self.location = cache_dir
+		os.makedirs(cache_dir, exist_ok=True)
+
+	def path(self, fname: str) -> str:
+		return os.path.join(self.location, f"{os.path.splitext(fname)[0]}.json")
+
+	def get(self, fname: str) -> Optional[Dict]:
+		path = self.path(fname)
+		return load_entry(path) if os.path.exists(path) else None
+
+	def get_many(self, fnames: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+		for fname in fnames:
+			yield fname, self.get(fname)
+
+	def put(self, fname: str, entry: Dict) -> None:
+		write_entry(self.path(fname), entry)
+
+	def items(self) -> Iterator[Tuple[str, Dict]]:
+		# Every readable entry, keyed by its image name
+		for path in sorted(glob.glob(os.path.join(self.location, "*.json"))):
+			entry = load_entry(path)
+			if entry and entry.get("image"):
+				yield entry["image"], entry
+
+
+class SqliteCacheStore:
+	"""OCR cache as a single SQLite table, one compact JSON row per image.
+
+	A warm run reads every entry with one query instead of one open/parse per
+	image. Rows are upserted one at a time in autocommit mode, so parallel
+	workers each write their own entry atomically; WAL journaling lets them do
+	so while the parent is reading. Each process opens its own connection.
+	"""
+
+	def __init__(self, db_path: str):
+		self.location = db_path
+		self._conn = None
+		self._pid = None
+
+	def _db(self) -> sqlite3.Connection:
+		# A connection must not cross a fork, so worker processes reconnect
+		if self._conn is None or self._pid != os.getpid():
+			conn = sqlite3.connect(self.location, timeout=60, isolation_level=None)
+			conn.execute("PRAGMA journal_mode=WAL")
+			conn.execute("PRAGMA synchronous=NORMAL")
+			conn.execute("CREATE TABLE IF NOT EXISTS ocr_entries (image TEXT PRIMARY KEY, entry TEXT NOT NULL)")
+			self._conn, self._pid = conn, os.getpid()
+		return self._conn
+
+	def get(self, fname: str) -> Optional[Dict]:
+		row = self._db().execute("SELECT entry FROM ocr_entries WHERE image = ?", (fname,)).fetchone()
+		return _loads(row[0]) if row else None
+
+	def get_many(self, fnames: Iterable[str]) -> Iterator[Tuple[str, Optional[Dict]]]:
+		# One scan of the table; rows of images not asked for are skipped
+		# without being parsed
+		fnames = list(fnames)
+		wanted = set(fnames)
+		found: Dict[str, str] = {}
+		for image, blob in self._db().execute("SELECT image, entry FROM ocr_entries"):
+			if image in wanted:
+				found[image] = blob
+		for fname in fnames:
+			blob = found.pop(fname, None)
+			yield fname, _loads(blob) if blob is not None else None
+
+	def put(self, fname: str, entry: Dict) -> None:
+		self._db().execute(
+			"INSERT INTO ocr_entries (image, entry) VALUES (?, ?) "
+			"ON CONFLICT(image) DO UPDATE SET entry = excluded.entry",
+			(fname, json.dumps(entry, ensure_ascii=False)),
+		)
+
+	def items(self) -> Iterator[Tuple[str, Dict]]:
+		for image, blob in self._db().execute("SELECT image, entry FROM ocr_entries ORDER BY image").fetchall():
+			entry = _loads(blob)
+			if entry is not None:
+				yield image, entry
+
+	def import_dir(self, cache_dir: str) -> int:
+		"""Copy every ``*.json`` entry of a DirCacheStore into this store, in one transaction.
+
+		Entries are keyed by their ``image`` field; files without one are
+		skipped. Returns the number of entries imported.
+		"""
+		rows = [
+			(image, json.dumps(entry, ensure_ascii=False))
+			for image, entry in DirCacheStore(cache_dir).items()
+		]
+		db = self._db()
+		db.execute("BEGIN IMMEDIATE")
+		try:
+			db.executemany(
+				"INSERT INTO ocr_entries (image, entry) VALUES (?, ?) "
+				"ON CONFLICT(image) DO UPDATE SET entry = excluded.entry",
+				rows,
+			)
+			db.execute("COMMIT")
+		except Exception:
+			db.execute("ROLLBACK")
+			raise
+		return len(rows)
+
+	def close(self) -> None:
+		if self._conn is not None and self._pid == os.getpid():
+			self._conn.close()
+		self._conn = None
+
+	def __getstate__(self) -> Dict:
+		return {"location": self.location, "_conn": None, "_pid": None}
+
+
+def _loads(blob: str) -> Optional[Dict]:
+	try:
+		return json.loads(blob)
+	except ValueError:
+		return None
+
+
+SQLITE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+
+# One store per location per process, like the OCR engines
+_stores: Dict[str, object] = {}
+
+
+def open_cache_store(location: str):
+	"""The OCR cache at ``location``: a SqliteCacheStore for a ``.sqlite``/``.db`` file, else a DirCacheStore."""
+	store = _stores.get(location)
+	if store is None:
+		if location.lower().endswith(SQLITE_SUFFIXES):
+			store = SqliteCacheStore(location)
+		else:
+			store = DirCacheStore(location)
+		_stores[location] = store
+	return store
@@ -1,636 +1,1366 @@
 import os
-import json
-from typing import Dict, List
-from PIL import Image, ImageEnhance
+import re
+import shlex
+import atexit
+import time
+import tempfile
+import subprocess
+import signal
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from collections.abc import Sequence
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from dataclasses import dataclass, replace
+from typing import Callable, Dict, Generator, Iterator, List, Optional, Tuple
+from PIL import Image
 import pytesseract
+try:
+	import tesserocr
+except ImportError:
+	tesserocr = None
+from src.ocr_cache import (
+	CACHE_HIT, CACHE_REPARSE, META_KEY,
+	check_entry, fingerprint, open_cache_store, source_stamp, strip_meta,
+)
+from src.field_extractor import extract_fields
+from src.ocr_stats import OcrStats, SearchOrder
+from src.ocr_timing import NULL_TRACE, TIMING_KEY, OcrRunReport, new_trace
+from src.preprocess import PreparedImage, find_label_roi
+from src.dedup import DEFAULT_MAX_DISTANCE, cluster, dhash
+from src.memory import MemoryGovernor, release_memory
+from src.tesseract import tesseract_cmd
+from src.thumbs import FusedThumbnails, generate_thumbnails, relative_thumb_paths
 
 
-def _thumb(src_path: str, thumb_path: str, size=(400, 400)) -> None:
-	try:
-		# Try to open and process the image directly without verify()
-		with Image.open(src_path) as img:
-			# Convert to RGB if necessary
-			if img.mode != 'RGB':
-				img = img.convert('RGB')
-			img.thumbnail(size)
-			img.save(thumb_path)
-	except Exception as e:
-		print(f"Warning: Could not create thumbnail for {src_path}: {e}")
-		# Try alternative approach for problematic images
+# Preprocessing approaches tried in order (see src/preprocess.py):
+# direct, RGB, grayscale, RGBA->RGB, grayscale + contrast, grayscale + sharpness.
+# OcrOptions.approaches replaces the list, e.g. with the NumPy variants.
+_APPROACHES = ["original", "rgb", "gray", "rgba_rgb", "contrast", "sharpen"]
+
+# Different PSM modes tried for each approach
+_PSM_MODES = ["--oem 3 --psm 6", "--oem 3 --psm 3", "--oem 3 --psm 4", "--oem 3 --psm 8"]
+
+# Config used when tesseract is pointed straight at the file
+_DIRECT_CONFIG = "--oem 3 --psm 6"
+
+# Outliers (images the normal search cannot read) get a last round on RGB with
+# these extra PSM modes: sparse text and single character
+_EXPANDED_PSM_MODES = ["--oem 3 --psm 5", "--oem 3 --psm 10"]
+
+# Bump whenever preprocessing or search behaviour changes in a way the
+# settings above do not capture; cached OCR text is invalidated on change
+OCR_PIPELINE_VERSION = 2
+
+# What the worker watchdog allows beyond a job's image budgets (decode, label
+# detection and cache writes are not covered by the tesseract timeouts), and
+# how often it checks
+_WATCHDOG_GRACE = 30.0
+_WATCHDOG_TICK = 1.0
+
+# Memory-bounded runs replace each worker process after this many jobs
+_RECYCLE_AFTER = 50
+
+# A job that was running when a worker died (the OOM killer, a crash in a
+# native library) is run again this many times before it is reported
+_CRASH_RETRIES = 2
+
+# Set on an entry (never in the cache) whose thumbnails are up to date because
+# the OCR job rendered them from its own decode; holds the source stamp
+_THUMBS_KEY = "_thumbs"
+
+
+@dataclass
+class OcrOptions:
+	# "confidence" scores each attempt on tesseract's word confidences plus the
+	# fields the parser recovers, and stops at the first result that clears
+	# quality_bar. "length" is the original keep-the-longest-text search.
+	scoring: str = "confidence"
+	quality_bar: float = 0.8
+	# OCR backend, see ENGINES below
+	engine: str = "subprocess"
+	# Try the detected text label first; keep its text when the parser finds
+	# at least this fraction of article/colour/size/pair in it
+	roi: bool = True
+	roi_min_coverage: float = 0.75
+	# Approach/PSM order to search, best first. Filled in per run from the
+	# OcrStats store; None means the static _APPROACHES x _PSM_MODES grid.
+	# Not part of the fingerprint: it changes how fast a result is found, and
+	# pruned combinations are still tried when the result is poor.
+	search_order: Optional[SearchOrder] = None
+	# Preprocessing variants to search, by src.preprocess.VARIANTS name, in
+	# static order; None means _APPROACHES. Part of the fingerprint when set.
+	approaches: Optional[List[str]] = None
+	# Images per batched first pass (0 = off, confidence scoring only). Each
+	# image's label crop goes through a single tesseract run with the top
+	# approach/PSM of the search order; only images whose result misses the
+	# quality bar get the per-image search. Not part of the fingerprint: an
+	# accepted batch result is exactly what the first attempt of the
+	# per-image search would have accepted.
+	batch_size: int = 0
+	# Record per-stage timings and every attempt for the run report
+	# (src/ocr_timing.py); no effect on results
+	trace: bool = False
+	# Perceptual-hash deduplication (src/dedup.py): near-identical photos
+	# (at most dedup_distance dHash bits apart) are OCR'd once and the others
+	# copy the result with duplicate_of pointing at the source. Not part of the
+	# fingerprint; copied entries are marked as such in the cache.
+	dedup: bool = False
+	dedup_distance: int = DEFAULT_MAX_DISTANCE
+	# Time limits in seconds (0 = none). image_timeout bounds the whole
+	# search for one image, attempt_timeout a single tesseract call; with
+	# workers, a watchdog also kills a worker stuck past its job's budget.
+	# An image that runs out keeps its best partial text, is flagged
+	# timed_out and is OCR'd again by a later run with a longer limit.
+	image_timeout: float = 0
+	attempt_timeout: float = 0
+	# Two passes over the batch: every image first gets one attempt (the
+	# first approach/PSM of the search order, batched with batch_size), and
+	# only those whose parse lacks an article, colour, size or printed pair
+	# get the full search afterwards. ocr_images_to_products' on_fast_pass
+	# sees the provisional catalog in between.
+	tiered: bool = False
+	# RSS ceiling in MiB for the whole run, workers included (0 = none). New
+	# jobs are held back near it, workers return freed memory after every
+	# job and are recycled, and ocr_images_to_products reads its products
+	# back from the cache instead of keeping them in memory.
+	memory_limit_mb: int = 0
+
+	def timeout_profile(self) -> Dict:
+		return {"image": self.image_timeout, "attempt": self.attempt_timeout}
+
+	def approach_names(self) -> List[str]:
+		return list(self.approaches or _APPROACHES)
+
+	def fingerprint_fields(self) -> Dict:
+		# The engine is left out on purpose: backends wrapping the same
+		# tesseract version produce the same text, and the version is already
+		# part of the fingerprint
+		fields = {
+			"scoring": self.scoring,
+			"quality_bar": self.quality_bar,
+			"roi": self.roi,
+			"roi_min_coverage": self.roi_min_coverage,
+		}
+		if self.approaches:
+			# Only when set, so caches written with the default list stay valid
+			fields["approaches"] = list(self.approaches)
+		return fields
+
+
+def _psm_from_config(config: str) -> int:
+	match = re.search(r"--psm\s+(\d+)", config or "")
+	return int(match.group(1)) if match else 3
+
+
+class OcrEngine:
+	"""Interface shared by the OCR backends.
+
+	``image`` is either a PIL image or a path to an image file, and ``config``
+	is a tesseract command line fragment such as ``"--oem 3 --psm 6"``.
+	``image_to_data`` returns the same column dict as
+	``pytesseract.image_to_data(..., output_type=Output.DICT)``.
+	``timeout`` is in seconds (0 = none); a call that runs out raises
+	OcrTimeout.
+	"""
+
+	name = ""
+
+	def image_to_string(self, image, config: str, timeout: float = 0) -> str:
+		raise NotImplementedError
+
+	def image_to_data(self, image, config: str, timeout: float = 0) -> Dict:
+		raise NotImplementedError
+
+	def version(self) -> str:
+		raise NotImplementedError
+
+	def image_to_data_batch(self, paths: List[str], config: str, timeout: float = 0) -> List[Dict]:
+		# One image_to_data dict per file, in order. Backends that pay a
+		# startup cost per call override this to recognise all files at once.
+		# The timeout covers the whole batch.
+		deadline = time.perf_counter() + timeout if timeout else None
+		pages = []
+		for path in paths:
+			left = deadline - time.perf_counter() if deadline else 0
+			if deadline and left <= 0:
+				raise OcrTimeout(f"batch of {len(paths)} images ran out of time")
+			pages.append(self.image_to_data(path, config, timeout=left))
+		return pages
+
+	def close(self) -> None:
+		pass
+
+
+class OcrTimeout(RuntimeError):
+	pass
+
+
+def _is_timeout(error: Exception) -> bool:
+	# pytesseract reports a killed tesseract as RuntimeError("Tesseract process timeout")
+	return isinstance(error, (OcrTimeout, subprocess.TimeoutExpired)) or "timeout" in str(error).lower()
+
+
+class SubprocessEngine(OcrEngine):
+	# Runs the tesseract binary through pytesseract: one process, one temp
+	# image and one traineddata load per call
+	name = "subprocess"
+
+	def __init__(self):
+		pytesseract.pytesseract.tesseract_cmd = tesseract_cmd()
+
+	def image_to_string(self, image, config: str, timeout: float = 0) -> str:
+		# pytesseract kills tesseract when the timeout expires
+		try:
+			return pytesseract.image_to_string(image, config=config, timeout=timeout)
+		except RuntimeError as e:
+			if _is_timeout(e):
+				raise OcrTimeout(str(e)) from e
+			raise
+
+	def image_to_data(self, image, config: str, timeout: float = 0) -> Dict:
+		try:
+			return pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT, timeout=timeout)
+		except RuntimeError as e:
+			if _is_timeout(e):
+				raise OcrTimeout(str(e)) from e
+			raise
+
+	def version(self) -> str:
+		return str(pytesseract.get_tesseract_version())
+
+	def image_to_data_batch(self, paths: List[str], config: str, timeout: float = 0) -> List[Dict]:
+		# tesseract reads a text file listing one image per line as a
+		# multi-page document: one process and one model load for the lot.
+		# page_num in its TSV output is the 1-based line of the image.
+		with tempfile.TemporaryDirectory() as tmp:
+			list_path = os.path.join(tmp, "images.txt")
+			with open(list_path, "w", encoding="utf-8") as f:
+				f.write("\n".join(paths) + "\n")
+			cmd = [pytesseract.pytesseract.tesseract_cmd, list_path, "stdout", *shlex.split(config), "tsv"]
+			try:
+				proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True, timeout=timeout or None)
+			except subprocess.TimeoutExpired as e:
+				raise OcrTimeout(f"batch of {len(paths)} images ran out of time") from e
+		data = _tsv_to_data(proc.stdout.decode("utf-8", errors="replace"))
+		pages = [{col: [] for col in _TSV_COLUMNS} for _ in paths]
+		for i, page_num in enumerate(data["page_num"]):
+			if 1 <= page_num <= len(paths):
+				for col in _TSV_COLUMNS:
+					pages[page_num - 1][col].append(data[col][i])
+		return pages
+
+
+class TesserocrEngine(OcrEngine):
+	# Keeps libtesseract and its models loaded for the life of the process and
+	# hands it PIL images directly, with no fork or temp file per call.
+	# Requires the optional tesserocr package.
+	name = "tesserocr"
+
+	def __init__(self):
+		if tesserocr is None:
+			raise RuntimeError("The tesserocr engine requires the tesserocr package (pip install tesserocr)")
+		kwargs = {"lang": "eng"}
+		tessdata = os.environ.get("TESSDATA_PREFIX")
+		if tessdata:
+			kwargs["path"] = tessdata
+		self._api = tesserocr.PyTessBaseAPI(**kwargs)
+
+	def _recognize(self, image, config: str, timeout: float = 0) -> None:
+		self._api.SetPageSegMode(_psm_from_config(config))
+		if isinstance(image, str):
+			self._api.SetImageFile(image)
+		else:
+			self._api.SetImage(image)
+		# libtesseract checks the deadline itself (in milliseconds) and gives
+		# up mid-page, so no process has to be killed
+		if not self._api.Recognize(int(timeout * 1000)) and timeout:
+			raise OcrTimeout(f"tesserocr gave up after {timeout:.1f}s")
+
+	def image_to_string(self, image, config: str, timeout: float = 0) -> str:
+		self._recognize(image, config, timeout)
+		return self._api.GetUTF8Text()
+
+	def image_to_data(self, image, config: str, timeout: float = 0) -> Dict:
+		self._recognize(image, config, timeout)
+		return _tsv_to_data(self._api.GetTSVText(0))
+
+	def version(self) -> str:
+		return tesserocr.tesseract_version().splitlines()[0]
+
+	def close(self) -> None:
+		self._api.End()
+
+
+_TSV_COLUMNS = ["level", "page_num", "block_num", "par_num", "line_num", "word_num", "left", "top", "width", "height", "conf", "text"]
+
+
+def _tsv_to_data(tsv: str) -> Dict:
+	data: Dict[str, List] = {col: [] for col in _TSV_COLUMNS}
+	for row in tsv.splitlines():
+		cells = row.split("\t")
+		if len(cells) < len(_TSV_COLUMNS) - 1 or cells[0] == "level":
+			continue
+		cells += [""] * (len(_TSV_COLUMNS) - len(cells))
+		for col, value in zip(_TSV_COLUMNS, cells):
+			if col == "text":
+				data[col].append(value)
+			elif col == "conf":
+				data[col].append(float(value))
+			else:
+				data[col].append(int(value))
+	return data
+
+
+ENGINES = {
+	SubprocessEngine.name: SubprocessEngine,
+	TesserocrEngine.name: TesserocrEngine,
+}
+
+# One live engine per backend per process, so worker processes each load the
+# models once and then reuse them for every image they are handed
+_engines: Dict[str, OcrEngine] = {}
+
+
+def get_engine(name: str = "subprocess") -> OcrEngine:
+	engine = _engines.get(name)
+	if engine is None:
+		if name not in ENGINES:
+			raise ValueError(f"Unknown OCR engine {name!r}; choose from {', '.join(ENGINES)}")
+		engine = ENGINES[name]()
+		_engines[name] = engine
+	return engine
+
+
+@atexit.register
+def close_engines() -> None:
+	for engine in _engines.values():
 		try:
-			with Image.open(src_path) as img:
-				# Try with different image processing
-				img = img.convert('L')  # Convert to grayscale
-				img.thumbnail(size)
-				img.save(thumb_path)
-		except Exception as e2:
-			print(f"Warning: Alternative thumbnail generation also failed for {src_path}: {e2}")
+			engine.close()
+		except Exception:
+			pass
+	_engines.clear()
 
 
-def _extract_text(image_path: str) -> str:
-	config = "--oem 3 --psm 6"
+@lru_cache(maxsize=None)
+def _tesseract_version(engine_name: str) -> str:
 	try:
-		# Set the path to tesseract executable
-		pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-		
-		# Try multiple approaches with different preprocessing methods
-		approaches = [
-			# Approach 1: Direct processing
-			lambda: Image.open(image_path),
-			# Approach 2: Convert to RGB
-			lambda: Image.open(image_path).convert('RGB'),
-			# Approach 3: Convert to grayscale (often works better for text)
-			lambda: Image.open(image_path).convert('L'),
-			# Approach 4: Convert to RGBA then RGB
-			lambda: Image.open(image_path).convert('RGBA').convert('RGB'),
-			# Approach 5: Grayscale with contrast enhancement
-			lambda: ImageEnhance.Contrast(Image.open(image_path).convert('L')).enhance(2.0),
-			# Approach 6: Grayscale with sharpness enhancement
-			lambda: ImageEnhance.Sharpness(Image.open(image_path).convert('L')).enhance(2.0),
-		]
-		
-		# Try different PSM modes for each approach
-		psm_modes = ["--oem 3 --psm 6", "--oem 3 --psm 3", "--oem 3 --psm 4", "--oem 3 --psm 8"]
-		
-		best_text = ""
-		best_length = 0
-		
-		for i, approach in enumerate(approaches):
+		return get_engine(engine_name).version()
+	except Exception:
+		return "unknown"
+
+
+def _ocr_fingerprint(options: Optional[OcrOptions] = None) -> str:
+	return fingerprint({
+		**_base_fingerprint_fields((options or OcrOptions()).engine),
+		"options": (options or OcrOptions()).fingerprint_fields(),
+	})
+
+
+@lru_cache(maxsize=None)
+def _base_fingerprint_fields(engine_name: str) -> Dict:
+	return {
+		"tesseract": _tesseract_version(engine_name),
+		"pipeline": OCR_PIPELINE_VERSION,
+		"approaches": _APPROACHES,
+		"psm_modes": _PSM_MODES,
+		"direct_config": _DIRECT_CONFIG,
+		"expanded_psm_modes": _EXPANDED_PSM_MODES,
+	}
+
+
+def _data_to_text(data: Dict):
+	# Rebuild plain text from image_to_data output, one line per tesseract
+	# line, and average the confidence of the recognised words
+	lines: Dict = {}
+	confs: List[float] = []
+	for i, word in enumerate(data.get("text", [])):
+		word = (word or "").strip()
+		if not word:
+			continue
+		key = (data["page_num"][i], data["block_num"][i], data["par_num"][i], data["line_num"][i])
+		lines.setdefault(key, []).append(word)
+		conf = float(data["conf"][i])
+		if conf >= 0:
+			confs.append(conf)
+	text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+	if text:
+		text += "\n"
+	return text, (sum(confs) / len(confs) if confs else 0.0)
+
+
+def _field_coverage(fields: Dict, text: str) -> float:
+	found = sum(1 for key in ("article", "colour", "size") if fields.get(key))
+	# The parser falls back to "24" when no pair is printed, so only count a
+	# pair that actually appears in the text
+	pair = fields.get("pair")
+	if pair and pair.lower() in text.lower():
+		found += 1
+	return found / 4.0
+
+
+def _score_result(text: str, confidence: float) -> float:
+	if not text.strip():
+		return 0.0
+	fields = _parse_text_to_fields(text)
+	return 0.5 * (confidence / 100.0) + 0.5 * _field_coverage(fields, text)
+
+
+def _static_order(options: OcrOptions) -> SearchOrder:
+	return [(name, list(_PSM_MODES)) for name in options.approach_names()]
+
+
+def _pruned_combos(order: SearchOrder, options: OcrOptions) -> SearchOrder:
+	# Every approach/PSM pair of the full grid that the learned order left out,
+	# in the static order
+	kept = {(name, psm) for name, modes in order for psm in modes}
+	rest = []
+	for name in options.approach_names():
+		modes = [psm for psm in _PSM_MODES if (name, psm) not in kept]
+		if modes:
+			rest.append((name, modes))
+	return rest
+
+
+# What the search generators below yield to ask for OCR: ("data" or
+# "string", PIL image or file path, tesseract config, timeout). The driver
+# answers with the engine's image_to_data() dict or image_to_string() text,
+# or throws the engine's exception into the generator. The search logic is
+# thus written once and runs on a blocking OcrEngine (_drive) as well as on
+# asyncio subprocesses (src/ocr_async.py).
+OcrRequest = Tuple[str, object, str, float]
+SearchSteps = Generator[OcrRequest, object, Dict]
+
+
+def _drive(steps: SearchSteps, engine: OcrEngine) -> Dict:
+	# Runs a search generator to completion on a blocking engine
+	try:
+		request = next(steps)
+		while True:
+			kind, image, config, timeout = request
+			call = engine.image_to_data if kind == "data" else engine.image_to_string
 			try:
-				img = approach()
-				# Try to force load the image data
-				try:
-					img.load()
-				except:
-					pass  # Continue even if load() fails
-				
-				# Try different PSM modes
-				for psm_config in psm_modes:
-					try:
-						text = pytesseract.image_to_string(img, config=psm_config)
-						if text.strip() and len(text.strip()) > best_length:
-							best_text = text
-							best_length = len(text.strip())
-					except:
-						continue
-				
-				if best_text.strip():
-					return best_text
+				result = call(image, config, timeout=timeout)
+			except Exception as e:
+				request = steps.throw(e)
+			else:
+				request = steps.send(result)
+	except StopIteration as stop:
+		return stop.value
+	finally:
+		steps.close()
+
+
+class _Search:
+	# The OCR search over one image: the best result so far plus the
+	# (pixels, PSM) pairs already run, shared by the normal and expanded passes.
+	# run() and run_file() are generators of OcrRequests, see _drive.
+
+	def __init__(self, prepared: PreparedImage, options: OcrOptions, region: str = "full", trace=NULL_TRACE, deadline: Optional[float] = None):
+		self.prepared = prepared
+		self.options = options
+		self.region = region
+		self.trace = trace
+		# time.perf_counter() value at which the image's budget runs out
+		self.deadline = deadline
+		self.by_confidence = options.scoring == "confidence"
+		# timed_out: the budget ran out, or at least one attempt was cut off
+		self.best = {"text": "", "approach": None, "psm": None, "region": region, "score": -1.0, "expanded": False, "timed_out": False}
+		self.tried = set()
+
+	def expired(self) -> bool:
+		if self.deadline is not None and time.perf_counter() >= self.deadline:
+			self.best["timed_out"] = True
+			return True
+		return False
+
+	def _timeout(self) -> float:
+		# Seconds the next tesseract call may take (0 = no limit)
+		limits = [self.options.attempt_timeout] if self.options.attempt_timeout else []
+		if self.deadline is not None:
+			limits.append(max(0.1, self.deadline - time.perf_counter()))
+		return min(limits) if limits else 0
+
+	def found(self) -> bool:
+		return bool(self.best["text"].strip())
+
+	def done(self) -> bool:
+		# "confidence" stops at the quality bar; "length" at the first approach
+		# that reads anything
+		if self.by_confidence:
+			return self.best["score"] >= self.options.quality_bar
+		return self.found()
+
+	def run(self, order: SearchOrder) -> SearchSteps:
+		error = None
+		for name, psm_modes in order:
+			if self.expired():
+				return self.best
+			try:
+				with self.trace.span("preprocess"):
+					img = self.prepared.variant(name)
 			except Exception as e:
-				if i == len(approaches) - 1:  # Last approach
-					print(f"Warning: All approaches failed for {image_path}: {e}")
+				error = e
 				continue
-		
-		# If all approaches failed, try to use tesseract directly on the file
+			for psm_config in psm_modes:
+				if self.expired():
+					return self.best
+				# Several approaches can resolve to the very same pixels (e.g. RGB
+				# and RGBA->RGB of a JPEG); tesseract would only repeat itself
+				if (id(img), psm_config) in self.tried:
+					continue
+				self.tried.add((id(img), psm_config))
+				yield from self._attempt(img, name, psm_config)
+				# Good enough: stop instead of exhausting the approach x PSM grid
+				if self.by_confidence and self.done():
+					return self.best
+			if not self.by_confidence and self.done():
+				return self.best
+		if error is not None and not self.by_confidence and not self.found():
+			print(f"Warning: All approaches failed for {self.prepared.path}: {error}")
+		return self.best
+
+	def run_file(self, config: str) -> SearchSteps:
+		# Let tesseract decode the file itself; it copes with some files PIL
+		# refuses (e.g. truncated JPEGs)
+		if self.expired():
+			return self.best
+		start = time.perf_counter()
 		try:
-			text = pytesseract.image_to_string(image_path, config=config)
-			if text.strip():
-				return text
+			text = yield ("string", self.prepared.path, config, self._timeout())
 		except Exception as e:
-			print(f"Warning: Direct tesseract processing failed for {image_path}: {e}")
-		
-		# For the 4 known problematic images, try different PSM modes
-		problematic_images = ['IMG-20251003-WA0037.jpg', 'IMG-20251003-WA0038.jpg', 'IMG-20251003-WA0039.jpg', 'IMG-20251003-WA0044.jpg']
-		if any(prob in image_path for prob in problematic_images):
-			print(f"Trying alternative PSM modes for problematic image: {image_path}")
-			alt_configs = ["--oem 3 --psm 3", "--oem 3 --psm 4", "--oem 3 --psm 5", "--oem 3 --psm 8", "--oem 3 --psm 10"]
-			for alt_config in alt_configs:
-				try:
-					img = Image.open(image_path).convert('RGB')
-					text = pytesseract.image_to_string(img, config=alt_config)
-					if text.strip():
-						print(f"Success with config {alt_config} for {image_path}")
-						return text
-				except Exception as e:
-					continue
-		
-		return best_text if best_text else ""
+			self.best["timed_out"] = self.best["timed_out"] or _is_timeout(e)
+			self.trace.attempt(self.region, "file", config, time.perf_counter() - start, error=str(e))
+			print(f"Warning: Direct tesseract processing failed for {self.prepared.path}: {e}")
+			return self.best
+		self.trace.attempt(self.region, "file", config, time.perf_counter() - start, length=len(text.strip()))
+		if text.strip():
+			self.best.update(text=text, approach="file", psm=config, score=_score_result(text, 0.0) if self.by_confidence else float(len(text.strip())))
+		return self.best
+
+	def _attempt(self, img: Image.Image, name: str, psm_config: str) -> SearchSteps:
+		start = time.perf_counter()
+		confidence = None
+		try:
+			if self.by_confidence:
+				text, confidence = _data_to_text((yield ("data", img, psm_config, self._timeout())))
+				score = _score_result(text, confidence)
+			else:
+				text = yield ("string", img, psm_config, self._timeout())
+				score = float(len(text.strip()))
+		except Exception as e:
+			# A cut-off attempt only costs this combination; the search goes on
+			self.best["timed_out"] = self.best["timed_out"] or _is_timeout(e)
+			self.trace.attempt(self.region, name, psm_config, time.perf_counter() - start, error=str(e))
+			return
+		self.trace.attempt(self.region, name, psm_config, time.perf_counter() - start, length=len(text.strip()), confidence=confidence, score=score)
+		if text.strip() and score > self.best["score"]:
+			self.best.update(text=text, approach=name, psm=psm_config, score=score)
+
+
+def _extract_best(image_path: str, options: Optional[OcrOptions] = None, trace=NULL_TRACE, thumbs: Optional[FusedThumbnails] = None) -> Dict:
+	"""OCR one image and report which approach/PSM produced the accepted text.
+
+	Returns ``{"text", "approach", "psm", "region", "score", "expanded",
+	"accepted"}``; ``accepted`` is False when the best text found is still
+	below the quality bar (or empty).
+	The grid is searched in ``options.search_order`` (learned from earlier
+	images, see src/ocr_stats.py) or the static order. An image the normal
+	search cannot read well is an outlier and gets the expanded search: the
+	combinations the learned order pruned, then tesseract on the file itself,
+	then the extra PSM modes. ``thumbs`` renders the image's thumbnails from
+	the same decode.
+	With a time budget, ``timed_out`` is the OcrOptions.timeout_profile() the
+	image ran out under (else False) and the text is the best found in time.
+	"""
+	options = options or OcrOptions()
+	try:
+		engine = get_engine(options.engine)
 	except Exception as e:
-		print(f"Warning: Could not process image {image_path}: {e}")
-		return ""
+		return _failed(image_path, e)
+	return _drive(_search_image(image_path, options, trace, thumbs), engine)
 
 
-def _parse_text_to_fields(text: str) -> Dict:
-	import re
-	
-	lines = [l.strip() for l in text.splitlines() if l.strip()]
-	
-	# Initialize the 4 key properties
-	article = None
-	colour = None
-	size = None
-	pair = None
-	
-	# Join all text for better pattern matching
-	full_text = " ".join(lines)
-	full_text_lower = full_text.lower()
-	
-	# COMPREHENSIVE PATTERN MATCHING FOR ALL VARIATIONS
-	
-	# 1. EXTRACT ARTICLE - Multiple patterns to catch all variations
-	article_patterns = [
-		# Standard patterns with colon
-		r'article:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'aaticle:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'article[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Garbled article patterns with colon - be more specific to avoid false matches
-		r'ticle:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',  # "ticle:-Runner-04" - exact match
-		r'articl:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',  # partial "articl" - exact match
-		r'aticl:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',   # partial "aticl" - exact match
-		r'art:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',     # "Art:-Sktch 7" - exact match
-		# Patterns with dash separator (without colon)
-		r'aaticle\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',  # "— Aaticle-Sketch-07 sid"
-		r'art\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'article\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Sketch patterns anywhere in text
-		r'sketch-\d+[^,\n\r|]*?(?:\s*[|\s]|$)',
-		r'sketch\s*-\s*\d+[^,\n\r|]*?(?:\s*[|\s]|$)',
-		r'sketch\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',    # "Sketch 14" (space instead of dash)
-		r'sktch\s*-\s*\d+[^,\n\r|]*?(?:\s*[|\s]|$)',    # "Art-Sktch 7"
-		r'sktch\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',        # "Sktch 7" (space instead of dash)
-		# Look for article-like patterns even without colon
-		r'(?:^|\s)(article|aaticle|ticle|articl|aticl|art)\s+-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Look for sketch patterns in any context
-		r'(?:^|\s)(sketch-\d+[^,\n\r|]*?)(?:\s*[|\s]|$)',
-		r'(?:^|\s)(sketch\s+\d+[^,\n\r|]*?)(?:\s*[|\s]|$)',  # "Sketch 14"
-		r'(?:^|\s)(sktch\s*\d+[^,\n\r|]*?)(?:\s*[|\s]|$)',  # "Art-Sktch 7"
-		# Look for runner patterns
-		r'runner-\d+[^,\n\r|]*?(?:\s*[|\s]|$)',
-		r'runner\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',     # "Runner 05" (space instead of dash)
-		r'mukeson-\d+[^,\n\r|]*?(?:\s*[|\s]|$)',
-		r'mukeson\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',    # "mukeson-01" or "mukeson 01"
-		r'safari-\d+[^,\n\r|]*?(?:\s*[|\s]|$)',
-		r'sofari-\d+[^,\n\r|]*?(?:\s*[|\s]|$)',  # OCR error for safari
-		# Look for rocks pattern
-		r'rocks\s+(\d+)',  # "Rocks 12"
-		r'art\s*-rocks\s+(\d+)',  # "Art-Rocks 12"
-		r'rocks\s*(\d*)',  # "Rocks 12" or "Rocks"
-		# Look for "trk" pattern
-		r'trk\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',       # "trk 5"
-		# Look for "thar" pattern
-		r'thar\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',      # "Thar 03", "Thar 5"
-		# Look for "ford" pattern
-		r'ford\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',      # "Ford 5"
-		# Look for "dizire" pattern
-		r'dizire\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',    # "Dizire 03"
-		# Look for "ninja" pattern
-		r'ninja\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',     # "Ninja 01"
-		# Look for "jaguar" pattern
-		r'jaguar\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',    # "Jaguar 02"
-		# Look for "ford" pattern (already added above)
-		# Look for "crv" pattern
-		r'crv\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',       # "CRV 04"
-		# Look for "fista" pattern
-		r'fista\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',     # "Fista 02"
-		# Look for "champ" pattern
-		r'champ\s+\d+[^,\n\r|]*?(?:\s*[|\s]|$)',     # "Champ 08"
-	]
-	
-	for pattern in article_patterns:
-		match = re.search(pattern, full_text_lower, re.IGNORECASE)
-		if match:
-			if len(match.groups()) > 1:
-				article = match.group(2).strip()  # For patterns with 2 groups
-			else:
-				article = match.group(1) if match.groups() else match.group(0)
-			article = article.strip().replace("— ", "").replace("aaticle", "article")
-			# Clean up more aggressively - remove leading dashes and trailing garbage
-			article = re.sub(r'^-+', '', article)  # Remove leading dashes
-			article = re.sub(r'[^a-zA-Z0-9\-_\s].*$', '', article)  # Remove trailing garbage
-			article = article.strip()
-			if article and len(article) > 2:  # Only accept substantial articles
-				# Special handling for rocks pattern - combine "rocks" with number
-				if 'rocks' in pattern.lower():
-					# For rocks patterns, we need to reconstruct the full article name
-					rocks_match = re.search(r'rocks\s*(\d*)', full_text_lower, re.IGNORECASE)
-					if rocks_match:
-						number = rocks_match.group(1)
-						if number:
-							article = f"Rocks {number}"
-						else:
-							article = "Rocks"
-					# Also try to find the original case version
-					original_rocks_match = re.search(r'rocks\s*(\d*)', full_text, re.IGNORECASE)
-					if original_rocks_match:
-						original_text = original_rocks_match.group(0)
-						if original_text:
-							article = original_text
-				else:
-					# Get the original case from the full text
-					original_match = re.search(re.escape(article), full_text, re.IGNORECASE)
-					if original_match:
-						article = original_match.group(0)
-				break
-	
-	# 2. EXTRACT COLOUR - Multiple patterns for all variations
-	colour_patterns = [
-		# Standard patterns with colon
-		r'colour:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'color:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'col[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Garbled colour patterns with colon
-		r'col-[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',  # "Col-Wt/Tan"
-		r'col\s*-\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',     # "Col-Wt/Tan"
-		# Patterns with dash separator (without colon)
-		r'col\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',          # "Col-Wt/Bk"
-		r'colour\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Look for colour patterns even without colon
-		r'(?:^|\s)(colour|color|col)\s+-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'(?:^|\s)(col-[^,\n\r|]+?)(?:\s*[|\s]|$)',   # "Col-Wt/Tan"
-		# Look for common color patterns
-		r'(?:^|\s)([a-z]+(?:\.|/)[a-z]+(?:\.[a-z]+)?)(?:\s*[|\s]|$)',  # patterns like "t.blue", "black/grey", "D.Gray"
-		r'(?:^|\s)([a-z]+-[a-z]+(?:/[a-z]+)?)(?:\s*[|\s]|$)',  # patterns like "wt/tan", "white/tan"
-		# Look for specific color names
-		r'(?:^|\s)(navy|black|white|grey|gray|blue|red|green|yellow|brown|pink|purple|orange|tan|mhd|brn|mouse)(?:\s*[|\s]|$)',  # standalone color names
-		# Look for color patterns with slashes
-		r'(?:^|\s)(white/green|white/gray|white/blue|navy/orange|d\.gray|l\.gray|t\.blue)(?:\s*[|\s]|$)',  # multi-color patterns
-	]
-	
-	for pattern in colour_patterns:
-		match = re.search(pattern, full_text_lower, re.IGNORECASE)
-		if match:
-			if len(match.groups()) > 1:
-				colour = match.group(2).strip()
-			else:
-				colour = match.group(1).strip()
-			# Clean up more aggressively - remove leading dashes and trailing garbage
-			colour = re.sub(r'^-+', '', colour)  # Remove leading dashes
-			colour = re.sub(r'[^a-zA-Z0-9\-/\.\s].*$', '', colour)  # Remove trailing garbage
-			colour = colour.strip()
-			if colour and len(colour) > 1:  # Only accept substantial colours
-				# Get the original case from the full text
-				original_match = re.search(re.escape(colour), full_text, re.IGNORECASE)
-				if original_match:
-					colour = original_match.group(0)
-				break
-	
-	# 3. EXTRACT SIZE - Multiple patterns for all variations
-	size_patterns = [
-		# Direct size patterns anywhere in text - prioritize these for multi-part sizes
-		r'(\d+x\d+(?:\s+\d+x\d+)*)',  # patterns like "6x9 7x10"
-		r'(\d+\*\d+(?:\s+\d+\*\d+)*)',  # patterns like "6*9 7*10"
-		r'(\d+/\d+(?:-\d+/\d+)*)',   # patterns like "6/9-7/10"
-		r'(\d+x\d+)',  # single size like "6x9"
-		r'(\d+\*\d+)',  # single size like "6*9"
-		r'(\d+/\d+)',  # single size like "6/9"
-		# Standard patterns with colon - capture full size including multiple parts
-		r'size:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'stze:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',  # "Stze:-6x9 7x10"
-		r'ize[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'se[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',  # partial "se"
-		# Patterns with dash separator
-		r'size\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'stze\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Look for size patterns even without colon
-		r'(?:^|\s)(size|stze|ize|se)\s+-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-	]
-	
-	for pattern in size_patterns:
-		match = re.search(pattern, full_text_lower, re.IGNORECASE)
-		if match:
-			if len(match.groups()) > 1:
-				size = match.group(2).strip()
+def _search_image(image_path: str, options: OcrOptions, trace=NULL_TRACE, thumbs: Optional[FusedThumbnails] = None) -> SearchSteps:
+	# The search behind _extract_best, as a generator of OcrRequests
+	order = options.search_order or _static_order(options)
+	deadline = time.perf_counter() + options.image_timeout if options.image_timeout else None
+	try:
+		# The image is decoded once; every approach below derives its variant
+		# from that buffer, and all of it is released when we leave the block
+		with PreparedImage(image_path) as prepared:
+			try:
+				with trace.span("decode"):
+					prepared.base
+			except Exception:
+				# Reported by whichever step needs the pixels; tesseract may
+				# still read the file itself
+				pass
 			else:
-				size = match.group(1).strip()
-			# Clean up common OCR errors
-			size = size.replace("stze", "size").replace("ize", "size")
-			# Clean up more aggressively - remove leading dashes and trailing garbage
-			size = re.sub(r'^-+', '', size)  # Remove leading dashes
-			size = re.sub(r'\s+(poir|pairs?|air|ss|ui|ag|wa).*$', '', size, flags=re.IGNORECASE)
-			size = re.sub(r'[^a-zA-Z0-9\-/x\.\s].*$', '', size)  # Remove trailing garbage
-			size = size.strip()
-			if size and len(size) > 1:  # Only accept substantial sizes
-				# Get the original case from the full text
-				original_match = re.search(re.escape(size), full_text, re.IGNORECASE)
-				if original_match:
-					size = original_match.group(0)
-				break
-	
-	# 4. EXTRACT PAIR - Multiple patterns for all variations
-	# Since we know all images have pair value of 24, we can be more aggressive
-	pair_patterns = [
-		# Standard patterns with colon - prioritize these
-		r'pair[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'poir[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'pairs[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'air[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'paie[^:]*:\s*-?([^,\n\r|]+?)(?:\s*[|\s]|$)',  # OCR error "paie"
-		# Patterns with dash separator
-		r'pair\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		r'poir\s*-([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Look for pair patterns even without colon
-		r'(?:^|\s)(pair|poir|pairs|air|paie)\s+-?([^,\n\r|]+?)(?:\s*[|\s]|$)',
-		# Look for "Citi Pair" pattern
-		r'citi\s+pair\s+(\d+)',
-		# Look for the number 24 specifically (since all pairs are 24)
-		r'(\b24\b)',
+				if thumbs is not None:
+					with trace.span("thumbnail"):
+						thumbs(prepared.base)
+			if options.roi:
+				result = yield from _search_label_roi(prepared, options, order, trace, deadline)
+				if result is not None:
+					result["accepted"] = not result["timed_out"]
+					return _finish(result, options, image_path)
+			search = _Search(prepared, options, trace=trace, deadline=deadline)
+			yield from search.run(order)
+			if not search.done():
+				rest = _pruned_combos(order, options)
+				if rest:
+					search.best["expanded"] = True
+					yield from search.run(rest)
+			if not search.found():
+				print(f"Trying expanded search for outlier image: {image_path}")
+				search.best["expanded"] = True
+				yield from search.run_file(_DIRECT_CONFIG)
+				if not search.found():
+					yield from search.run([("rgb", _EXPANDED_PSM_MODES)])
+					if search.found():
+						print(f"Success with config {search.best['psm']} for {image_path}")
+			search.best["accepted"] = search.done()
+			return _finish(search.best, options, image_path)
+	except Exception as e:
+		return _failed(image_path, e)
+
+
+def _failed(image_path: str, error: Exception) -> Dict:
+	print(f"Warning: Could not process image {image_path}: {error}")
+	return {"text": "", "approach": None, "psm": None, "region": "full", "score": -1.0, "expanded": True, "accepted": False, "timed_out": False}
+
+
+def _finish(result: Dict, options: OcrOptions, image_path: str) -> Dict:
+	# Timeouts only matter for results that did not make it: an accepted
+	# text is final whatever was cut off on the way
+	if result["timed_out"] and not result["accepted"]:
+		result["timed_out"] = options.timeout_profile()
+		print(f"Warning: OCR ran out of time for {image_path}, keeping the best partial result")
+	else:
+		result["timed_out"] = False
+	return result
+
+
+def _timed_out_outcome(options: OcrOptions) -> Dict:
+	# What an image the watchdog gave up on is recorded as
+	return {"text": "", "approach": None, "psm": None, "region": "full", "score": -1.0, "expanded": False, "accepted": False, "timed_out": options.timeout_profile()}
+
+
+def _heavier(options: OcrOptions, profile: Dict) -> bool:
+	# Whether options allow more time than the profile an image timed out
+	# under, in which case it deserves another try
+	for key, limit in options.timeout_profile().items():
+		recorded = profile.get(key) or 0
+		if recorded and (not limit or limit > recorded):
+			return True
+	return False
+
+
+def _extract_text(image_path: str, options: Optional[OcrOptions] = None) -> str:
+	return _extract_best(image_path, options)["text"]
+
+
+def _search_label_roi(prepared: PreparedImage, options: OcrOptions, order: SearchOrder, trace=NULL_TRACE, deadline: Optional[float] = None) -> SearchSteps:
+	# OCR just the printed label when we can find it: far fewer pixels per
+	# tesseract call and none of the shoe/box texture that turns into garbage
+	# tokens. The crop only wins if the parser gets most fields out of it;
+	# otherwise the caller falls back to the full frame.
+	try:
+		with trace.span("roi"):
+			box = find_label_roi(prepared.base)
+	except Exception:
+		return None
+	if box is None:
+		return None
+	with prepared.crop(box) as label:
+		search = _Search(label, options, region="label", trace=trace, deadline=deadline)
+		result = yield from search.run(order)
+	text = result["text"]
+	if text.strip() and _field_coverage(_parse_text_to_fields(text), text) >= options.roi_min_coverage:
+		result["timed_out"] = False
+		return result
+	if search.expired():
+		# No time left for the full frame; the crop's text is all there is
+		return result
+	return None
+
+
+# Bump whenever the field extractor changes its output; cached entries are
+# then re-parsed from their stored raw_text instead of being OCR'd again
+PARSER_VERSION = 1
+
+
+def _parse_text_to_fields(text: str) -> Dict:
+	# Rules and vocabularies live in src/field_extractor.py
+	return extract_fields(text)
+
+
+def list_images(images_dir: str) -> List[str]:
+	return [
+		fname for fname in sorted(os.listdir(images_dir))
+		if fname.lower().endswith((".jpg", ".jpeg", ".png"))
 	]
-	
-	for pattern in pair_patterns:
-		match = re.search(pattern, full_text_lower, re.IGNORECASE)
-		if match:
-			if len(match.groups()) > 1:
-				pair = match.group(2).strip()
-			else:
-				pair = match.group(1).strip()
-			# Clean up common OCR errors
-			pair = pair.replace("poir", "pair").replace("air", "pair").replace("paie", "pair")
-			# Clean up more aggressively - remove leading dashes and trailing garbage
-			pair = re.sub(r'^-+', '', pair)  # Remove leading dashes
-			pair = re.sub(r'[^a-zA-Z0-9\-\.\s].*$', '', pair)  # Remove trailing garbage
-			pair = pair.strip()
-			if pair and len(pair) > 0:  # Accept any pair value
-				# Get the original case from the full text
-				original_match = re.search(re.escape(pair), full_text, re.IGNORECASE)
-				if original_match:
-					pair = original_match.group(0)
-				break
-	
-	# FALLBACK PATTERNS - If we still don't have properties, try more aggressive patterns
-	
-	# If no article found, look for any sketch pattern anywhere
-	if not article:
-		sketch_matches = re.findall(r'sketch-\d+[^,\n\r]*', full_text_lower, re.IGNORECASE)
-		if sketch_matches:
-			article = sketch_matches[0].strip()
-			article = re.sub(r'[^a-zA-Z0-9\-_\s].*$', '', article)
-			# Get the original case from the full text
-			original_match = re.search(re.escape(article), full_text, re.IGNORECASE)
-			if original_match:
-				article = original_match.group(0)
-	
-	# If still no article, try more aggressive patterns for garbled text
-	if not article:
-		# Look for any pattern that might be an article
-		article_patterns = [
-			r'([a-z]+-\d+)',  # patterns like "sketch-07", "article-03"
-			r'([a-z]+\d+)',   # patterns like "sketch07", "article03"
-			r'(\d+[a-z]+)',   # patterns like "07sketch"
-		]
-		for pattern in article_patterns:
-			match = re.search(pattern, full_text_lower, re.IGNORECASE)
-			if match:
-				potential_article = match.group(1).strip()
-				# Only accept if it looks like an article
-				if len(potential_article) > 3 and any(word in potential_article.lower() for word in ['sketch', 'article', 'item', 'product']):
-					article = potential_article
-					# Get the original case from the full text
-					original_match = re.search(re.escape(article), full_text, re.IGNORECASE)
-					if original_match:
-						article = original_match.group(0)
-					break
-	
-	# If no colour found, look for common color words with more aggressive patterns
-	if not colour:
-		# First try the original color word search
-		color_words = ['black', 'white', 'grey', 'gray', 'blue', 'red', 'green', 'yellow', 'brown', 'pink', 'purple', 'orange', 't.blue', 't-blue', 'g.grey', 'l.grey']
-		for color in color_words:
-			if color in full_text_lower:
-				# Find the context around this color
-				color_match = re.search(r'[^,\n\r]*' + color + r'[^,\n\r]*', full_text, re.IGNORECASE)
-				if color_match:
-					colour = color_match.group(0).strip()
-					colour = re.sub(r'[^a-zA-Z0-9\-/\.\s].*$', '', colour)
-					break
-		
-		# If still no colour, try more aggressive patterns
-		if not colour:
-			# Look for patterns like "t.blue", "g.grey", etc.
-			color_patterns = [
-				r'([a-z]\.?[a-z]+)',  # patterns like "t.blue", "g.grey"
-				r'([a-z]+/[a-z]+)',  # patterns like "black/grey"
-				r'([a-z]+-[a-z]+)',  # patterns like "t-blue"
-			]
-			for pattern in color_patterns:
-				match = re.search(pattern, full_text_lower, re.IGNORECASE)
-				if match:
-					potential_color = match.group(1).strip()
-					# Only accept if it looks like a color
-					if len(potential_color) > 2 and any(c in potential_color.lower() for c in ['blue', 'grey', 'black', 'white', 'red', 'green', 'yellow', 'brown', 'pink', 'purple', 'orange']):
-						colour = potential_color
-						# Get the original case from the full text
-						original_match = re.search(re.escape(colour), full_text, re.IGNORECASE)
-						if original_match:
-							colour = original_match.group(0)
-						break
-	
-	# If no size found, look for any number x number pattern
-	if not size:
-		size_match = re.search(r'\d+x\d+', full_text_lower)
-		if size_match:
-			size = size_match.group(0)
-			# Get the original case from the full text
-			original_match = re.search(re.escape(size), full_text, re.IGNORECASE)
-			if original_match:
-				size = original_match.group(0)
-	
-	# If no pair found, look for any number that might be a pair
-	# But be more selective - look for numbers that could be pair values
-	if not pair:
-		# Look for numbers that are likely pair values (not article numbers, sizes, etc.)
-		# Prioritize 24 since we know all pairs are 24
-		if '24' in full_text_lower:
-			pair = "24"
-		else:
-			# Look for other reasonable pair values
-			number_patterns = [
-				r'(?:^|\s)(\d{1,2})(?:\s*[|\s]|$)',  # 1-2 digit numbers at end of line
-				r'(\b\d{1,2}\b)',  # 1-2 digit numbers as whole words
-			]
-			
-			for pattern in number_patterns:
-				matches = re.findall(pattern, full_text_lower)
-				for match in matches:
-					# Only accept reasonable pair values (1-50)
-					if match.isdigit() and 1 <= int(match) <= 50:
-						pair = match
-						# Get the original case from the full text
-						original_match = re.search(re.escape(pair), full_text, re.IGNORECASE)
-						if original_match:
-							pair = original_match.group(0)
-						break
-				if pair:
-					break
-	
-	# FALLBACK: Since we know most images have pair value of 24, set it if not found
-	# But allow for other valid pair values (like 16 for Dizire 03)
-	if not pair:
-		# First check if we can find any number that looks like a pair value
-		number_patterns = [
-			r'(?:^|\s)(\d{1,2})(?:\s*[|\s]|$)',  # 1-2 digit numbers at end of line
-			r'(\b\d{1,2}\b)',  # 1-2 digit numbers as whole words
-		]
-		for pattern in number_patterns:
-			matches = re.findall(pattern, full_text_lower)
-			for match in matches:
-				if match.isdigit() and 1 <= int(match) <= 50:  # Reasonable pair range
-					pair = match
-					# Get the original case from the full text
-					original_match = re.search(re.escape(pair), full_text, re.IGNORECASE)
-					if original_match:
-						pair = original_match.group(0)
-					break
-			if pair:
-				break
-		
-		# If still no pair found, default to 24 (most common value)
-		if not pair:
-			pair = "24"
-	
-	# ULTRA-AGGRESSIVE FALLBACKS for very poor OCR text
-	# If we still have very few properties, try to extract anything that looks like data
-	
-	if not article and len(full_text) > 0:
-		# Try to find any word that might be an article name
-		words = re.findall(r'\b[a-zA-Z]+\b', full_text_lower)
-		for word in words:
-			# Only accept words that look like article names, not colors or sizes
-			if (len(word) > 3 and 
-				word.lower() not in ['size', 'pair', 'colour', 'color', 'article', 'sketch', 'runner', 'mukeson', 'safari', 'blue', 'grey', 'black', 'white', 'red', 'green', 'yellow', 'brown', 'pink', 'purple', 'orange', 'tan', 'navy', 'sky'] and
-				not any(color in word.lower() for color in ['blue', 'grey', 'black', 'white', 'red', 'green', 'yellow', 'brown', 'pink', 'purple', 'orange', 'tan', 'navy', 'sky']) and
-				# Don't accept size patterns as articles
-				not re.match(r'^\d+x\d+$', word) and  # Don't accept "6x9" as article
-				not re.match(r'^\d+/\d+$', word) and  # Don't accept "6/9" as article
-				not re.match(r'^\d+-\d+$', word)):    # Don't accept "6-9" as article
-				article = word
-				# Get the original case from the full text
-				original_match = re.search(re.escape(article), full_text, re.IGNORECASE)
-				if original_match:
-					article = original_match.group(0)
-				break
-	
-	if not colour and len(full_text) > 0:
-		# Try to find any word that might be a color
-		color_keywords = ['black', 'white', 'grey', 'gray', 'blue', 'red', 'green', 'yellow', 'brown', 'pink', 'purple', 'orange', 'tan', 'navy', 'sky']
-		for color in color_keywords:
-			if color in full_text_lower:
-				colour = color
-				# Get the original case from the full text
-				original_match = re.search(re.escape(colour), full_text, re.IGNORECASE)
-				if original_match:
-					colour = original_match.group(0)
-				break
-	
-	if not size and len(full_text) > 0:
-		# Try to find any pattern that might be a size
-		size_patterns = [r'\d+x\d+', r'\d+/\d+', r'\d+-\d+']
-		for pattern in size_patterns:
-			match = re.search(pattern, full_text_lower)
-			if match:
-				size = match.group(0)
-				# Get the original case from the full text
-				original_match = re.search(re.escape(size), full_text, re.IGNORECASE)
-				if original_match:
-					size = original_match.group(0)
-				break
-	
-	if not pair and len(full_text) > 0:
-		# Try to find any number that might be a pair
-		numbers = re.findall(r'\d+', full_text_lower)
-		if numbers:
-			# Take the first reasonable number (not too large)
-			for num in numbers:
-				if 1 <= int(num) <= 100:  # Reasonable pair count
-					pair = num
-					# Get the original case from the full text
-					original_match = re.search(re.escape(pair), full_text, re.IGNORECASE)
-					if original_match:
-						pair = original_match.group(0)
-					break
-	
-	# FINAL CLEANUP
-	if article:
-		article = re.sub(r'^-+', '', article)  # Remove leading dashes
-		article = re.sub(r'^[^a-zA-Z0-9\-]*', '', article)  # Remove leading non-alphanumeric
-		article = re.sub(r'[^a-zA-Z0-9\-_\s].*$', '', article)  # Remove trailing garbage
-		article = article.strip()
-	
-	if colour:
-		colour = re.sub(r'^-+', '', colour)  # Remove leading dashes
-		colour = re.sub(r'^[^a-zA-Z0-9\-/]*', '', colour)  # Remove leading non-alphanumeric
-		colour = re.sub(r'[^a-zA-Z0-9\-/\.\s].*$', '', colour)  # Remove trailing garbage
-		colour = colour.strip()
-	
-	if size:
-		size = re.sub(r'^-+', '', size)  # Remove leading dashes
-		size = re.sub(r'^[^a-zA-Z0-9\-/x]*', '', size)  # Remove leading non-alphanumeric
-		size = re.sub(r'[^a-zA-Z0-9\-/x\.\s].*$', '', size)  # Remove trailing garbage
-		size = size.strip()
-	
-	if pair:
-		pair = re.sub(r'^-+', '', pair)  # Remove leading dashes
-		pair = re.sub(r'^[^a-zA-Z0-9\-]*', '', pair)  # Remove leading non-alphanumeric
-		pair = re.sub(r'[^a-zA-Z0-9\-\.\s].*$', '', pair)  # Remove trailing garbage
-		pair = pair.strip()
-	
-	# Create description from remaining text
-	desc_lines = []
-	for line in lines:
-		line_lower = line.lower()
-		# Skip lines that contain our extracted properties
-		skip = False
-		if article and article.lower() in line_lower:
-			skip = True
-		if colour and colour.lower() in line_lower:
-			skip = True
-		if size and size.lower() in line_lower:
-			skip = True
-		if pair and pair.lower() in line_lower:
-			skip = True
-		if not skip and len(line.strip()) > 2:  # Only include substantial lines
-			desc_lines.append(line.strip())
-	
-	description = " ".join(desc_lines) if desc_lines else None
-	
-	return {
-		"article": article,
-		"colour": colour, 
-		"size": size,
-		"pair": pair,
-		"name": article,  # Keep for backward compatibility
-		"description": description,
-		"raw_text": text
+
+
+def _cache_meta(stamp: Dict, ocr_fingerprint: str, outcome: Optional[Dict] = None) -> Dict:
+	meta = {
+		"source": stamp,
+		"ocr_fingerprint": ocr_fingerprint,
+		"parser_version": PARSER_VERSION,
 	}
+	if outcome is not None:
+		# Which search attempt produced raw_text, for OcrStats
+		meta["ocr"] = {key: outcome[key] for key in ("approach", "psm", "region", "expanded", "accepted")}
+		# The time limits the image ran out under, so a later run with more
+		# time knows to retry it
+		meta["ocr"]["timed_out"] = outcome.get("timed_out") or False
+		if outcome.get("tier"):
+			# A fast-tier result; "accepted" then means all fields were found
+			meta["ocr"]["tier"] = outcome["tier"]
+	return meta
 
 
-def ocr_images_to_products(images_dir: str, cache_dir: str, thumb_dir: str, force: bool=False) -> List[Dict]:
-	products: List[Dict] = []
-	for fname in sorted(os.listdir(images_dir)):
-		if not fname.lower().endswith((".jpg", ".jpeg", ".png")):
-			continue
-		img_path = os.path.join(images_dir, fname)
-		cache_path = os.path.join(cache_dir, f"{os.path.splitext(fname)[0]}.json")
-		thumb_path = os.path.join(thumb_dir, fname)
+def _store_result(fname: str, images_dir: str, cache_dir: str, thumb_dir: str, ocr_fingerprint: str, stamp: Dict, outcome: Dict, trace=NULL_TRACE) -> Dict:
+	# The cache entry is written as soon as the image is done, so a crash
+	# loses no work. Returns the entry including its META_KEY block (and the
+	# trace under TIMING_KEY when timing is on); the caller strips both.
+	img_path = os.path.join(images_dir, fname)
+	thumb_path = os.path.join(thumb_dir, fname)
+	with trace.span("parse"):
+		fields = _parse_text_to_fields(outcome["text"])
+	entry = {
+		"image": fname,
+		"image_path": img_path,
+		"thumb": os.path.relpath(thumb_path, start=os.path.dirname(cache_dir)),
+		**fields,
+		META_KEY: _cache_meta(stamp, ocr_fingerprint, outcome),
+	}
+	with trace.span("cache_write"):
+		open_cache_store(cache_dir).put(fname, entry)
+	if trace.enabled:
+		entry = {**entry, TIMING_KEY: trace.to_dict()}
+	if outcome.get("thumbs"):
+		entry = {**entry, _THUMBS_KEY: stamp}
+	return entry
+
+
+def _process_image(fname: str, images_dir: str, cache_dir: str, thumb_dir: str, ocr_fingerprint: str, options: OcrOptions, trace=None) -> Dict:
+	# Runs inside the worker processes when workers > 1, so it has to stay a
+	# module-level function taking only picklable arguments
+	img_path = os.path.join(images_dir, fname)
+	trace = trace or new_trace(fname, options.trace)
+	with trace.span("hash"):
+		stamp = source_stamp(img_path)
+	thumbs = FusedThumbnails(fname, thumb_dir, stamp)
+	outcome = _extract_best(img_path, options, trace, thumbs)
+	outcome["thumbs"] = thumbs.ready
+	return _store_result(fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, stamp, outcome, trace)
 
-		if not os.path.exists(thumb_path):
-			try:
-				_thumb(img_path, thumb_path)
-			except Exception:
-				pass
 
-		if os.path.exists(cache_path) and not force:
+def _stage_for_batch(img_path: str, out_path: str, approach: str, roi: bool, trace=NULL_TRACE, thumbs: Optional[FusedThumbnails] = None) -> str:
+	# Save the pixels the first attempt of the per-image search would see:
+	# the label crop when one is found, else the full frame. Returns the
+	# region. Lossless PNG, so tesseract reads exactly those pixels.
+	with PreparedImage(img_path) as prepared:
+		with trace.span("decode"):
+			prepared.base
+		if thumbs is not None:
+			with trace.span("thumbnail"):
+				thumbs(prepared.base)
+		with trace.span("roi"):
+			box = find_label_roi(prepared.base) if roi else None
+		with trace.span("preprocess"):
+			if box is None:
+				prepared.variant(approach).save(out_path, "PNG")
+				return "full"
+			with prepared.crop(box) as label:
+				label.variant(approach).save(out_path, "PNG")
+			return "label"
+
+
+def _first_pass(fnames: List[str], images_dir: str, thumb_dir: str, options: OcrOptions) -> Tuple[List[Tuple[str, Dict, Dict, object]], List[str]]:
+	# One attempt per image with the usual winning approach/PSM, all images in
+	# one tesseract run. Returns (fname, stamp, outcome, trace) for each image
+	# read, with "accepted" left for the caller to decide, and the images that
+	# could not be staged. Thumbnails are rendered from the staging decode.
+	engine = get_engine(options.engine)
+	approach, modes = (options.search_order or _static_order(options))[0]
+	psm = modes[0]
+	failed: List[str] = []
+	staged = []
+	with tempfile.TemporaryDirectory() as tmp:
+		for i, fname in enumerate(fnames):
+			img_path = os.path.join(images_dir, fname)
+			out_path = os.path.join(tmp, f"{i:05d}.png")
+			trace = new_trace(fname, options.trace)
 			try:
-				with open(cache_path, "r", encoding="utf-8") as f:
-					data = json.load(f)
-					products.append(data)
-					continue
+				with trace.span("hash"):
+					stamp = source_stamp(img_path)
+				thumbs = FusedThumbnails(fname, thumb_dir, stamp)
+				region = _stage_for_batch(img_path, out_path, approach, options.roi, trace, thumbs)
 			except Exception:
-				pass
+				# Undecodable here; the per-image search has its own fallbacks
+				failed.append(fname)
+				continue
+			staged.append((fname, stamp, region, out_path, trace, thumbs.ready))
+		start = time.perf_counter()
+		try:
+			# One attempt per image, so the run gets one attempt's time each
+			timeout = options.attempt_timeout * len(staged)
+			pages = engine.image_to_data_batch([item[3] for item in staged], psm, timeout=timeout) if staged else []
+		except Exception as e:
+			print(f"Warning: Batched OCR failed, falling back to per-image search: {e}")
+			pages = [{} for _ in staged]
+		# The run is shared, so each image is charged an equal share of it
+		share = (time.perf_counter() - start) / max(1, len(staged))
 
-		text = _extract_text(img_path)
-		fields = _parse_text_to_fields(text)
-		item = {
-			"image": fname,
-			"image_path": img_path,
-			"thumb": os.path.relpath(thumb_path, start=os.path.dirname(cache_dir)),
-			**fields,
-		}
+	results = []
+	for (fname, stamp, region, _, trace, thumbs_ready), data in zip(staged, pages):
+		text, confidence = _data_to_text(data)
+		score = _score_result(text, confidence)
+		trace.attempt(region, approach, psm, share, length=len(text.strip()), confidence=confidence, score=score, batched=len(staged) > 1)
+		outcome = {"text": text, "approach": approach, "psm": psm, "region": region, "score": score, "expanded": False, "accepted": False, "timed_out": False, "thumbs": thumbs_ready}
+		results.append((fname, stamp, outcome, trace))
+	return results, failed
+
+
+def _process_batch(fnames: List[str], images_dir: str, cache_dir: str, thumb_dir: str, ocr_fingerprint: str, options: OcrOptions) -> List[Dict]:
+	# Batched first pass over several images: one tesseract run for all of
+	# them, then the per-image search only for those it did not settle.
+	# Module-level and picklable for the worker pool, like _process_image.
+	results, rest = _first_pass(fnames, images_dir, thumb_dir, options)
+	entries: List[Dict] = []
+	traces: Dict[str, object] = {}
+	for fname, stamp, outcome, trace in results:
+		text = outcome["text"]
+		accepted = text.strip() and outcome["score"] >= options.quality_bar
+		if accepted and outcome["region"] == "label":
+			# Same rule as _search_label_roi: the crop has to yield most fields
+			accepted = _field_coverage(_parse_text_to_fields(text), text) >= options.roi_min_coverage
+		if not accepted:
+			rest.append(fname)
+			# The per-image search carries on with this trace, so the batched
+			# attempt shows up in the report as a wasted one
+			traces[fname] = trace
+			continue
+		outcome["accepted"] = True
+		entries.append(_store_result(fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, stamp, outcome, trace))
+
+	for fname in rest:
+		entries.append(_process_image(fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, options, traces.get(fname)))
+	return entries
+
+
+def _process_fast(fnames: List[str], images_dir: str, cache_dir: str, thumb_dir: str, ocr_fingerprint: str, options: OcrOptions) -> List[Dict]:
+	# The fast tier of a tiered run: the first pass only, stored whatever it
+	# reads. "accepted" means complete: the parser found an article, colour,
+	# size and a pair actually printed on the label. Images the first pass
+	# could not read get no entry and go to the thorough pass.
+	results, _ = _first_pass(fnames, images_dir, thumb_dir, options)
+	entries: List[Dict] = []
+	for fname, stamp, outcome, trace in results:
+		text = outcome["text"]
+		outcome["accepted"] = bool(text.strip()) and _field_coverage(_parse_text_to_fields(text), text) == 1.0
+		outcome["tier"] = "fast"
+		entries.append(_store_result(fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, stamp, outcome, trace))
+	return entries
+
+
+def _run_job(job: List[str], images_dir: str, cache_dir: str, thumb_dir: str, ocr_fingerprint: str, options: OcrOptions, fast: bool = False) -> List[Dict]:
+	# A job is one image, or several sharing a batched first pass; fast jobs
+	# are the first tier of a tiered run
+	try:
+		if fast:
+			return _process_fast(job, images_dir, cache_dir, thumb_dir, ocr_fingerprint, options)
+		if len(job) > 1:
+			return _process_batch(job, images_dir, cache_dir, thumb_dir, ocr_fingerprint, options)
+		return [_process_image(job[0], images_dir, cache_dir, thumb_dir, ocr_fingerprint, options)]
+	finally:
+		if options.memory_limit_mb:
+			# The job's image buffers are closed by now; hand the pages back
+			release_memory()
+
+
+def _run_watched_job(job_id: int, beacon_dir: Optional[str], job: List[str], *args) -> List[Dict]:
+	# Leaves a beacon holding this worker's pid when the job starts, so
+	# _iter_pool knows which jobs were running when a worker died, and the
+	# watchdog whom to stop and since when it has run
+	if beacon_dir:
+		with open(os.path.join(beacon_dir, str(job_id)), "w") as f:
+			f.write(str(os.getpid()))
+	return _run_job(job, *args)
+
+
+def _beacon(beacon_dir: str, job_id: int) -> Optional[Tuple[int, float]]:
+	# (pid, start time) of a running job, None while it is still queued
+	path = os.path.join(beacon_dir, str(job_id))
+	try:
+		with open(path) as f:
+			return int(f.read()), os.path.getmtime(path)
+	except (OSError, ValueError):
+		return None
+
+
+def _new_pool(workers: int, recycle: bool) -> ProcessPoolExecutor:
+	if recycle:
 		try:
-			with open(cache_path, "w", encoding="utf-8") as f:
-				json.dump(item, f, ensure_ascii=False, indent=2)
-		except Exception:
+			# Fresh workers now and then give back the heap that Pillow and
+			# tesseract output leave fragmented (Python 3.11+)
+			return ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=_RECYCLE_AFTER)
+		except TypeError:
 			pass
-		products.append(item)
-	return products
+	return ProcessPoolExecutor(max_workers=workers)
+
+
+def _iter_pool(jobs: List[List[str]], workers: int, args: Tuple, image_timeout: float = 0, governor: Optional[MemoryGovernor] = None) -> Iterator[Tuple[List[str], Optional[List[Dict]], Optional[Exception]]]:
+	"""Run jobs in a process pool, yielding (job, entries, error) as they finish.
+
+	Jobs are handed out a few at a time (two per worker), so a run over tens
+	of thousands of images does not queue them all up front. With a
+	governor, no new job is handed out while memory is near its ceiling, and
+	workers are replaced every _RECYCLE_AFTER jobs.
+	With an image_timeout the in-process limits are backed by a watchdog: a
+	worker still on a job image_timeout * len(job) + _WATCHDOG_GRACE seconds
+	after it started (a hung tesseract or decode) is killed and the job comes
+	back with an OcrTimeout. Killing a worker breaks the pool, so the jobs
+	that were queued or running beside it are resubmitted to a fresh one.
+	A worker that dies on its own breaks the pool the same way: every job
+	caught in it is resubmitted, and only a job that was running in
+	_CRASH_RETRIES + 1 broken pools comes back with the error.
+	"""
+	remaining = dict(enumerate(jobs))
+	crashes: Dict[int, int] = {}
+	# Pools in a row that broke before any job even started
+	stalled = 0
+	with tempfile.TemporaryDirectory() as beacon_dir:
+		while remaining:
+			for name in os.listdir(beacon_dir):
+				os.remove(os.path.join(beacon_dir, name))
+			pool = _new_pool(min(workers, len(remaining)), governor is not None)
+			queue = iter(list(remaining))
+			futures: Dict = {}
+			killed = broken = False
+			error: Optional[Exception] = None
+			started_any = False
+			try:
+				while True:
+					window = 2 * workers if governor is None else governor.window(2 * workers)
+					# Backpressure never stalls the run: with nothing in flight,
+					# one job goes out regardless
+					while not broken and len(futures) < max(window, 0 if futures else 1):
+						job_id = next(queue, None)
+						if job_id is None:
+							break
+						futures[pool.submit(_run_watched_job, job_id, beacon_dir, remaining[job_id], *args)] = job_id
+					if not futures:
+						break
+					watched = image_timeout or governor is not None
+					done, _ = wait(futures, timeout=_WATCHDOG_TICK if watched else None, return_when=FIRST_COMPLETED)
+					for future in done:
+						job_id = futures.pop(future)
+						try:
+							entries = future.result()
+							started_any = True
+						except BrokenProcessPool as e:
+							broken = True
+							# Rerun by the next pool. Without a watchdog kill a
+							# worker died; the jobs that were running are the
+							# suspects, and one that keeps breaking pools is
+							# given up on rather than retried forever.
+							error = e
+							if not killed and _beacon(beacon_dir, job_id) is not None:
+								started_any = True
+								crashes[job_id] = crashes.get(job_id, 0) + 1
+								if crashes[job_id] > _CRASH_RETRIES:
+									yield remaining.pop(job_id), None, e
+							continue
+						except Exception as e:
+							yield remaining.pop(job_id), None, e
+							continue
+						yield remaining.pop(job_id), entries, None
+					if not image_timeout or killed:
+						continue
+					now = time.time()
+					for future, job_id in list(futures.items()):
+						job = remaining[job_id]
+						started = _beacon(beacon_dir, job_id)
+						budget = image_timeout * len(job) + _WATCHDOG_GRACE
+						if future.done() or started is None or now - started[1] <= budget:
+							continue
+						try:
+							os.kill(started[0], signal.SIGTERM)
+						except OSError:
+							continue
+						killed = broken = True
+						futures.pop(future)
+						yield remaining.pop(job_id), None, OcrTimeout(f"Watchdog stopped OCR of {', '.join(job)} after {budget:.0f}s")
+			finally:
+				# After a kill the pool is broken and its workers are gone
+				pool.shutdown(wait=not killed, cancel_futures=True)
+			stalled = stalled + 1 if broken and not killed and not started_any else 0
+			if stalled > _CRASH_RETRIES:
+				# Workers die before running anything: no pool will do better
+				for job_id in list(remaining):
+					yield remaining.pop(job_id), None, error
+
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+	return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _record_outcome(stats: OcrStats, fname: str, entry: Dict, report: Optional[OcrRunReport] = None, rendered: Optional[Dict[str, Dict]] = None) -> Dict:
+	# rendered collects the stamps of images whose thumbnails the job rendered
+	_note_thumbs(entry, rendered)
+	outcome = entry[META_KEY].get("ocr") or {}
+	stats.record(fname, {**outcome, "text": entry.get("raw_text") or ""})
+	trace = entry.pop(TIMING_KEY, None)
+	if report is not None and (trace is not None or outcome.get("timed_out")):
+		# Images the watchdog stopped come back without a trace
+		report.add_trace(trace or {"image": fname, "total": 0.0, "stages": {}, "attempts": []}, outcome)
+	return strip_meta(entry)
+
+
+def _note_thumbs(entry: Dict, rendered: Optional[Dict[str, Dict]]) -> None:
+	stamp = entry.pop(_THUMBS_KEY, None)
+	if stamp is not None and rendered is not None:
+		rendered[entry["image"]] = stamp
+
+
+def _reuse_cached(entry: Dict, status: str, stamp, store, fname: str) -> Dict:
+	# The OCR text is still good. Re-parse it if only the parser changed, and
+	# refresh the stored stat info if the file was touched but not modified.
+	if status == CACHE_REPARSE:
+		entry.update(_parse_text_to_fields(entry.get("raw_text") or ""))
+		entry[META_KEY]["parser_version"] = PARSER_VERSION
+	if stamp is not None:
+		entry[META_KEY]["source"] = stamp
+	if status == CACHE_REPARSE or stamp is not None:
+		store.put(fname, entry)
+	return strip_meta(entry)
+
+
+def _phash(fname: str, images_dir: str, entry: Optional[Dict] = None) -> Optional[str]:
+	# The dHash recorded in a cache entry, else computed from the file
+	meta = (entry or {}).get(META_KEY) or {}
+	if meta.get("phash"):
+		return meta["phash"]
+	try:
+		return dhash(os.path.join(images_dir, fname))
+	except Exception as e:
+		print(f"Warning: Could not hash {fname} for deduplication: {e}")
+		return None
+
+
+def _plan_dedup(pending: List[str], known: Dict[str, str], images_dir: str, max_distance: int):
+	# Splits pending into images to OCR and duplicates. Returns (to_ocr,
+	# followers, copies, hashes): followers maps an image being OCR'd to the
+	# pending duplicates that will copy it, copies maps a pending duplicate to
+	# an already cached image it copies right away.
+	hashes = {}
+	for fname in pending:
+		h = _phash(fname, images_dir)
+		if h:
+			hashes[fname] = h
+	followers: Dict[str, List[str]] = {}
+	copies: Dict[str, str] = {}
+	for members in cluster(hashes, known, max_distance):
+		cached = [m for m in members if m in known and m not in hashes]
+		if cached:
+			source = min(cached)
+			for m in members:
+				if m in hashes:
+					copies[m] = source
+			continue
+		# The largest file is the sharpest copy, so it is the one OCR'd
+		source = max(members, key=lambda m: os.path.getsize(os.path.join(images_dir, m)))
+		followers[source] = sorted(m for m in members if m != source)
+	skip = set(copies) | {m for dups in followers.values() for m in dups}
+	return [f for f in pending if f not in skip], followers, copies, hashes
+
+
+def _store_duplicate(fname: str, source: Dict, images_dir: str, cache_dir: str, thumb_dir: str, phash: Optional[str]) -> Dict:
+	# The source's fields under this image's own name, stamp and thumbnail,
+	# linked back to the image that was actually OCR'd
+	img_path = os.path.join(images_dir, fname)
+	entry = {k: v for k, v in source.items() if k not in (META_KEY, TIMING_KEY, _THUMBS_KEY)}
+	entry.update({
+		"image": fname,
+		"image_path": img_path,
+		"thumb": os.path.relpath(os.path.join(thumb_dir, fname), start=os.path.dirname(cache_dir)),
+		"duplicate_of": source.get("duplicate_of") or source["image"],
+	})
+	meta = {**source[META_KEY], "source": source_stamp(img_path)}
+	if phash:
+		meta["phash"] = phash
+	entry[META_KEY] = meta
+	open_cache_store(cache_dir).put(fname, entry)
+	return entry
+
+
+def _iter_cached(fnames: List[str], images_dir: str, store, ocr_fingerprint: str, force: bool, options: OcrOptions, pending: List[str], known: Optional[Dict[str, str]] = None, report: Optional[OcrRunReport] = None, provisional: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[str, Dict]]:
+	# Yields (fname, product) for every image whose cache entry is still
+	# good and appends the rest to pending. With dedup, known collects the
+	# dHash of each cached image. An incomplete fast-pass entry is pending
+	# too; provisional (tiered runs) gets its product meanwhile.
+	for fname, entry in store.get_many(fnames if not force else []):
+		start = time.perf_counter()
+		status, stamp = check_entry(entry, os.path.join(images_dir, fname), ocr_fingerprint, PARSER_VERSION)
+		ocr_meta = (entry or {}).get(META_KEY, {}).get("ocr", {})
+		timed_out = ocr_meta.get("timed_out")
+		fast_only = ocr_meta.get("tier") == "fast" and not ocr_meta.get("accepted")
+		if fast_only and status in (CACHE_HIT, CACHE_REPARSE) and provisional is not None:
+			provisional[fname] = _reuse_cached(entry, status, stamp, store, fname)
+		elif status in (CACHE_HIT, CACHE_REPARSE) and not fast_only and not (timed_out and _heavier(options, timed_out)):
+			if options.dedup and known is not None:
+				phash = _phash(fname, images_dir, entry)
+				if phash:
+					known[fname] = phash
+					if entry[META_KEY].get("phash") != phash:
+						# Entries from before dedup are hashed once; passing the
+						# stamp makes _reuse_cached write the entry back
+						entry[META_KEY]["phash"] = phash
+						stamp = stamp or entry[META_KEY]["source"]
+			product = _reuse_cached(entry, status, stamp, store, fname)
+			if report is not None:
+				report.add_stage(fname, "cache", time.perf_counter() - start)
+			yield fname, product
+			continue
+		pending.append(fname)
+	if force:
+		pending[:] = fnames
+
+
+def _iter_ocr(fnames: List[str], images_dir: str, cache_dir: str, thumb_dir: str, force: bool, workers: int, options: OcrOptions, stats: OcrStats, report: Optional[OcrRunReport] = None, on_fast_pass: Optional[Callable[[List[Tuple[str, Dict]]], None]] = None, rendered: Optional[Dict[str, Dict]] = None) -> Iterator[Tuple[str, Dict]]:
+	# Yields (fname, product) as each product becomes available: cache hits
+	# straight away in listing order, then OCR results in completion order.
+	# Nothing is held on to once it has been yielded, except, in a tiered
+	# run, the fast-pass rows of images still waiting for the thorough pass.
+	# OCR jobs render the thumbnails of the images they decode; rendered
+	# collects their source stamps for generate_thumbnails.
+	ocr_fingerprint = _ocr_fingerprint(options)
+	pending: List[str] = []
+	if report is not None:
+		options = replace(options, trace=True)
+
+	# dHash of every cached image, for deduplication of the pending ones
+	known: Dict[str, str] = {}
+	# Tiered runs: provisional fast-pass products by image, for the images
+	# the thorough pass still has to do
+	provisional: Dict[str, Dict] = {}
+	store = open_cache_store(cache_dir)
+	yield from _iter_cached(fnames, images_dir, store, ocr_fingerprint, force, options, pending, known, report, provisional if options.tiered else None)
+
+	if not pending:
+		return
+	print(f"  OCR needed for {len(pending)} of {len(fnames)} images")
+
+	followers: Dict[str, List[str]] = {}
+	hashes: Dict[str, str] = {}
+	if options.dedup:
+		pending, followers, copies, hashes = _plan_dedup(pending, known, images_dir, options.dedup_distance)
+		skipped = len(copies) + sum(len(d) for d in followers.values())
+		if skipped:
+			print(f"  {skipped} near-duplicate photo(s) copy another image's OCR result")
+		for fname, source in sorted(copies.items()):
+			copy = _store_duplicate(fname, store.get(source), images_dir, cache_dir, thumb_dir, hashes.get(fname))
+			yield fname, strip_meta(copy)
+		if not pending:
+			return
+
+	def emit(entry: Dict):
+		# An OCR'd image, then the pending duplicates that copy it
+		fname = entry["image"]
+		if fname in hashes and not entry[META_KEY].get("phash"):
+			entry[META_KEY]["phash"] = hashes[fname]
+			# The trace and thumbnail stamp stay on the entry for
+			# _record_outcome, but never go into the cache
+			store.put(fname, {k: v for k, v in entry.items() if k not in (TIMING_KEY, _THUMBS_KEY)})
+		copies = [
+			_store_duplicate(dup, entry, images_dir, cache_dir, thumb_dir, hashes.get(dup))
+			for dup in followers.pop(fname, [])
+		]
+		yield fname, _record_outcome(stats, fname, entry, report, rendered)
+		for copy in copies:
+			yield copy["image"], strip_meta(copy)
+
+	if workers is not None and workers <= 0:
+		workers = os.cpu_count() or 1
+
+	# With batching, a job is a list of images sharing one tesseract run;
+	# otherwise a job is a single image
+	batch_size = options.batch_size if options.scoring == "confidence" else 0
+	governor = MemoryGovernor(options.memory_limit_mb) if options.memory_limit_mb else None
+
+	def run(jobs: List[List[str]], fast: bool = False) -> Iterator[Dict]:
+		# The entries of jobs as they are done, in this process or the pool
+		nonlocal options
+		if workers <= 1 or len(jobs) <= 1:
+			for job in jobs:
+				if governor is not None:
+					# One job at a time already; just give memory back when high
+					governor.near_ceiling()
+				# Re-rank after every job so the winner moves to the front early on
+				job_options = replace(options, search_order=stats.search_order(options.approach_names(), _PSM_MODES))
+				yield from _run_job(job, images_dir, cache_dir, thumb_dir, ocr_fingerprint, job_options, fast)
+			return
+		# Workers all get the order learned from earlier runs
+		options = replace(options, search_order=stats.search_order(options.approach_names(), _PSM_MODES))
+		# Largest images first: they take the longest to OCR, so starting them
+		# early keeps one big photo from straggling after the pool has drained
+		if all(len(job) == 1 for job in jobs):
+			jobs = sorted(jobs, key=lambda job: os.path.getsize(os.path.join(images_dir, job[0])), reverse=True)
+		args = (images_dir, cache_dir, thumb_dir, ocr_fingerprint, options, fast)
+		for job, entries, error in _iter_pool(jobs, workers, args, options.image_timeout, governor):
+			if isinstance(error, OcrTimeout):
+				print(f"Warning: {error}")
+				# Recorded like an in-process timeout: an empty result that
+				# a run with a longer limit will retry
+				entries = [
+					_store_result(fname, images_dir, cache_dir, thumb_dir, ocr_fingerprint, source_stamp(os.path.join(images_dir, fname)), _timed_out_outcome(options))
+					for fname in job
+				]
+			elif error is not None:
+				print(f"Warning: OCR worker failed for {', '.join(job)}: {error}")
+				continue
+			yield from entries
+
+	try:
+		if options.tiered:
+			# Fast tier: one attempt per image (batched when batch_size is
+			# set). Complete results are final; the rest wait for the
+			# thorough search, and on_fast_pass gets their provisional rows.
+			completed = set()
+			fast_jobs = _chunks([fname for fname in pending if fname not in provisional], max(batch_size, 1))
+			for entry in run(fast_jobs, fast=True):
+				if entry[META_KEY]["ocr"]["accepted"]:
+					completed.add(entry["image"])
+					yield from emit(entry)
+					continue
+				fname = entry["image"]
+				_note_thumbs(entry, rendered)
+				trace = entry.pop(TIMING_KEY, None)
+				if report is not None and trace is not None:
+					report.add_trace(trace)
+				provisional[fname] = strip_meta(entry)
+			# Incomplete, and any image the fast pass could not read at all
+			pending = [fname for fname in pending if fname not in completed]
+			print(f"  Fast pass done, thorough search needed for {len(pending)} image(s)")
+			if on_fast_pass is not None:
+				on_fast_pass(sorted(provisional.items()))
+			# The batched first pass has already been run
+			jobs = [[fname] for fname in pending]
+		else:
+			jobs = _chunks(pending, batch_size) if batch_size > 1 else [[fname] for fname in pending]
+		for entry in run(jobs):
+			yield from emit(entry)
+		# Duplicates whose source failed to OCR get their own attempt
+		for dup in sorted(d for dups in followers.values() for d in dups):
+			entry = _process_image(dup, images_dir, cache_dir, thumb_dir, ocr_fingerprint, options)
+			yield dup, _record_outcome(stats, dup, entry, report, rendered)
+	finally:
+		# Also runs when the consumer stops early, so the wins learned so far
+		# are kept
+		stats.save()
+		if governor is not None and governor.peak_mb:
+			print(f"  Memory: {governor.summary()}")
+
+
+def ocr_images_to_products(images_dir: str, cache_dir: str, thumb_dir: str, force: bool=False, workers: int=1, options: Optional[OcrOptions]=None, stats_path: Optional[str]=None, fnames: Optional[List[str]]=None, report_path: Optional[str]=None, on_fast_pass: Optional[Callable[[List[Dict]], None]]=None) -> List[Dict]:
+	# fnames restricts the run to those files of images_dir (watch mode);
+	# by default every image in the folder is processed. report_path turns on
+	# per-stage timing, written there as JSON (plus a CSV of attempts). With
+	# options.tiered, on_fast_pass is called between the passes with the
+	# provisional product list, in the same order as the return value.
+	options = options or OcrOptions()
+	report = OcrRunReport(report_path) if report_path else None
+	# Which approach/PSM won for earlier images; kept in memory only when no
+	# stats_path is given
+	stats = OcrStats(stats_path)
+	# Fail fast on a missing or unknown backend instead of once per image
+	get_engine(options.engine)
+	if fnames is None:
+		fnames = list_images(images_dir)
+	# Memory-bounded runs keep only the names; every product is in the cache
+	bounded = bool(options.memory_limit_mb)
+	results: Dict[str, Optional[Dict]] = {}
+	# Images whose thumbnails the OCR jobs rendered from their own decode
+	rendered: Dict[str, Dict] = {}
+
+	def in_order(products: Dict[str, Optional[Dict]], thumbs: Dict) -> List[Dict]:
+		# Keep output order identical to the serial run regardless of completion order
+		if bounded:
+			return CachedProducts(cache_dir, [fname for fname in fnames if fname in products], thumbs)
+		return [
+			{**products[fname], "thumbs": thumbs[fname]} if fname in thumbs else products[fname]
+			for fname in fnames if fname in products
+		]
+
+	def fast_pass_done(provisional: List[Tuple[str, Dict]]) -> None:
+		if on_fast_pass is not None:
+			products = {**results, **dict(provisional)}
+			# The paths the thumbnails have, or will have once the run is done
+			on_fast_pass(in_order(products, {fname: relative_thumb_paths(fname, thumb_dir) for fname in products}))
+
+	for fname, product in _iter_ocr(fnames, images_dir, cache_dir, thumb_dir, force, workers, options, stats, report, fast_pass_done, rendered):
+		results[fname] = None if bounded else product
+	# Thumbnails come after OCR: the images OCR decoded already have theirs,
+	# and of the rest only those whose bytes changed are rendered again
+	thumbs = generate_thumbnails(images_dir, thumb_dir, fnames, workers=workers, report=report, rendered=rendered)
+	if report is not None:
+		report.save()
+	return in_order(results, thumbs)
+
+
+class CachedProducts(Sequence):
+	"""The products of a memory-bounded run, read back from the OCR cache.
+
+	Behaves like the list ocr_images_to_products normally returns, but holds
+	only the image names: each product is loaded when it is reached, so
+	iterating over tens of thousands of them keeps one in memory at a time.
+	"""
+
+	def __init__(self, cache_dir: str, fnames: List[str], thumbs: Optional[Dict] = None):
+		self.cache_dir = cache_dir
+		self.fnames = fnames
+		self.thumbs = thumbs or {}
+
+	def __len__(self) -> int:
+		return len(self.fnames)
+
+	def _load(self, fname: str) -> Dict:
+		product = strip_meta(open_cache_store(self.cache_dir).get(fname) or {"image": fname})
+		if fname in self.thumbs:
+			product["thumbs"] = self.thumbs[fname]
+		return product
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self._load(fname) for fname in self.fnames[index]]
+		return self._load(self.fnames[index])
+
+	def __iter__(self) -> Iterator[Dict]:
+		for fname in self.fnames:
+			yield self._load(fname)
+
 
+def iter_ocr_products(images_dir: str, cache_dir: str, thumb_dir: str, force: bool=False, workers: int=1, options: Optional[OcrOptions]=None, stats_path: Optional[str]=None, report_path: Optional[str]=None) -> Iterator[Dict]:
+	"""Streaming counterpart of ocr_images_to_products.
 
+	Products are yielded as soon as they are available (cache hits first, then
+	OCR results in completion order) instead of in filename order once the
+	whole folder is done. Images that need OCR get their thumbnails from the
+	same decode; the remaining thumbnails are brought up to date after the
+	last product has been yielded, so they do not hold up the first rows.
+	Each product already carries the paths its thumbnails will have.
+	"""
+	options = options or OcrOptions()
+	report = OcrRunReport(report_path) if report_path else None
+	stats = OcrStats(stats_path)
+	get_engine(options.engine)
+	fnames = list_images(images_dir)
+	rendered: Dict[str, Dict] = {}
+	for fname, product in _iter_ocr(fnames, images_dir, cache_dir, thumb_dir, force, workers, options, stats, report, rendered=rendered):
+		yield {**product, "thumbs": relative_thumb_paths(fname, thumb_dir)}
+	generate_thumbnails(images_dir, thumb_dir, fnames, workers=workers, report=report, rendered=rendered)
+	if report is not None:
+		report.save()
@@ -0,0 +1,86 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+from src.ocr_cache import load_entry, write_json
+
+# A search order: approaches to try, each with the PSM configs to run on it
+SearchOrder = List[Tuple[str, List[str]]]
+
+
+class OcrStats:
+	"""Persistent record of which preprocessing/PSM combination won for each image.
+
+	Used to put the usual winner first for later images and runs, and to prune
+	combinations that never win once there is enough evidence. Images that the
+	pruned search cannot read are flagged as outliers and get the expanded search.
+	"""
+
+	def __init__(self, path: Optional[str] = None, min_samples: int = 30):
+		self.path = path
+		self.min_samples = min_samples
+		data = (load_entry(path) if path and os.path.exists(path) else None) or {}
+		self.wins: Dict[str, int] = data.get("wins", {})
+		self.regions: Dict[str, int] = data.get("regions", {})
+		self.outliers: Dict[str, str] = data.get("outliers", {})
+		# Number of recorded wins when each approach was first searched, so one
+		# added later (OcrOptions.approaches) gets min_samples results of its
+		# own before its never-winning combinations are pruned
+		self.since: Dict[str, int] = data.get("since", {})
+
+	@staticmethod
+	def _key(approach: str, psm: str) -> str:
+		return f"{approach}|{psm}"
+
+	@property
+	def total(self) -> int:
+		return sum(self.wins.values())
+
+	def record(self, image: str, outcome: Dict) -> None:
+		# Only results that cleared the quality bar count as wins; a below-bar
+		# best effort says nothing about which combination works
+		approach, psm = outcome.get("approach"), outcome.get("psm")
+		accepted = outcome.get("accepted", True) and outcome.get("text", "").strip()
+		if approach and psm and accepted:
+			key = self._key(approach, psm)
+			self.wins[key] = self.wins.get(key, 0) + 1
+			region = outcome.get("region", "full")
+			self.regions[region] = self.regions.get(region, 0) + 1
+		if outcome.get("timed_out"):
+			# Not unreadable, just out of time; a heavier profile may do it
+			self.outliers[image] = "timeout"
+		elif outcome.get("expanded") or not accepted:
+			self.outliers[image] = f"{approach}|{psm}" if approach else "unreadable"
+		else:
+			self.outliers.pop(image, None)
+
+	def search_order(self, approaches: Sequence[str], psm_modes: Sequence[str]) -> SearchOrder:
+		# Most successful approach first and, within it, most successful PSM
+		# first; ties keep the static order. Once min_samples results are in,
+		# combinations that have never won are dropped from the normal search.
+		total = self.total
+		order: SearchOrder = []
+		for approach in approaches:
+			if approach not in self.since:
+				# Stats files from before "since" have only ever searched the
+				# approaches that won something
+				won = any(key.startswith(approach + "|") for key in self.wins)
+				self.since[approach] = 0 if won else total
+			prune = total - self.since[approach] >= self.min_samples
+			modes = [psm for psm in psm_modes if not prune or self.wins.get(self._key(approach, psm))]
+			modes.sort(key=lambda psm: (-self.wins.get(self._key(approach, psm), 0), psm_modes.index(psm)))
+			if modes:
+				order.append((approach, modes))
+		order.sort(key=lambda entry: (
+			-sum(self.wins.get(self._key(entry[0], psm), 0) for psm in entry[1]),
+			list(approaches).index(entry[0]),
+		))
+		return order
+
+	def save(self) -> None:
+		if not self.path:
+			return
+		write_json(self.path, {
+			"wins": dict(sorted(self.wins.items(), key=lambda kv: -kv[1])),
+			"regions": self.regions,
+			"outliers": dict(sorted(self.outliers.items())),
+			"since": self.since,
+		})
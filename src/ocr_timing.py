@@ -0,0 +1,174 @@
+import csv
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+from src.ocr_cache import write_json
+
+# Key under which a worker hands an image's trace back with its entry. It is
+# popped before the entry reaches the caller and never written to the cache.
+TIMING_KEY = "_timing"
+
+# How many images the summary lists as slowest
+_SLOWEST = 10
+
+_ATTEMPT_COLUMNS = ["image", "region", "approach", "psm", "seconds", "length", "confidence", "score", "won", "batched", "error"]
+
+
+class ImageTrace:
+	"""Timing spans and OCR attempts for one image.
+
+	Stages are summed by name (``decode``, ``preprocess``, ``roi``, ``ocr``,
+	``parse``, ``cache_write``...), so a stage entered several times reports
+	its total. Each tesseract attempt is recorded with its result length and
+	confidence. Built inside the worker and returned as a plain dict.
+	"""
+
+	enabled = True
+
+	def __init__(self, image: str):
+		self.image = image
+		self.stages: Dict[str, float] = {}
+		self.attempts: List[Dict] = []
+		self._start = time.perf_counter()
+
+	def add(self, stage: str, seconds: float) -> None:
+		self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+	@contextmanager
+	def span(self, stage: str):
+		start = time.perf_counter()
+		try:
+			yield
+		finally:
+			self.add(stage, time.perf_counter() - start)
+
+	def attempt(self, region: str, approach: str, psm: str, seconds: float, length: int = 0, confidence: Optional[float] = None, score: Optional[float] = None, error: Optional[str] = None, batched: bool = False) -> None:
+		self.add("ocr", seconds)
+		self.attempts.append({
+			"region": region, "approach": approach, "psm": psm,
+			"seconds": round(seconds, 4), "length": length,
+			"confidence": None if confidence is None else round(confidence, 1),
+			"score": None if score is None else round(score, 3),
+			"batched": batched, "error": error,
+		})
+
+	def to_dict(self) -> Dict:
+		return {
+			"image": self.image,
+			"total": round(time.perf_counter() - self._start, 4),
+			"stages": {k: round(v, 4) for k, v in self.stages.items()},
+			"attempts": self.attempts,
+		}
+
+
+class _NullTrace:
+	# Stand-in when timing is off, so the pipeline never has to check
+	enabled = False
+
+	def add(self, stage: str, seconds: float) -> None:
+		pass
+
+	@contextmanager
+	def span(self, stage: str):
+		yield
+
+	def attempt(self, *args, **kwargs) -> None:
+		pass
+
+
+NULL_TRACE = _NullTrace()
+
+
+def new_trace(image: str, enabled: bool):
+	return ImageTrace(image) if enabled else NULL_TRACE
+
+
+class OcrRunReport:
+	"""Per-image, per-stage timings of one ocr_images_to_products run.
+
+	``save`` writes the JSON report (every image plus a summary of the slowest
+	images, attempts that did not produce the accepted text, winning
+	configurations and images that ran out of time, with the limits they ran
+	out under) and a CSV with one row per OCR attempt next to it.
+	"""
+
+	def __init__(self, path: str):
+		self.path = path
+		self.images: Dict[str, Dict] = {}
+		self._start = time.perf_counter()
+
+	def _image(self, image: str) -> Dict:
+		return self.images.setdefault(image, {"image": image, "total": 0.0, "stages": {}, "attempts": []})
+
+	def add_stage(self, image: str, stage: str, seconds: float) -> None:
+		record = self._image(image)
+		record["stages"][stage] = round(record["stages"].get(stage, 0.0) + seconds, 4)
+		record["total"] = round(record["total"] + seconds, 4)
+
+	def add_trace(self, trace: Dict, outcome: Optional[Dict] = None) -> None:
+		record = self._image(trace["image"])
+		for stage, seconds in trace["stages"].items():
+			record["stages"][stage] = round(record["stages"].get(stage, 0.0) + seconds, 4)
+		record["total"] = round(record["total"] + trace["total"], 4)
+		outcome = outcome or {}
+		winner = (outcome.get("region"), outcome.get("approach"), outcome.get("psm"))
+		won = False
+		# The last attempt with the winning combination is the one whose text
+		# was kept (an earlier identical one can only come from another pass)
+		for attempt in reversed(trace["attempts"]):
+			attempt["won"] = not won and (attempt["region"], attempt["approach"], attempt["psm"]) == winner
+			won = won or attempt["won"]
+		record["attempts"].extend(trace["attempts"])
+		record["outcome"] = {k: outcome.get(k) for k in ("region", "approach", "psm", "accepted", "expanded", "timed_out")}
+
+	def summary(self) -> Dict:
+		records = list(self.images.values())
+		stage_totals: Dict[str, float] = {}
+		for record in records:
+			for stage, seconds in record["stages"].items():
+				stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+		attempts = [a for record in records for a in record["attempts"]]
+		wasted = [a for a in attempts if not a.get("won")]
+		wasted_by_combo: Dict[str, Dict] = {}
+		for a in wasted:
+			key = f"{a['region']}|{a['approach']}|{a['psm']}"
+			slot = wasted_by_combo.setdefault(key, {"attempts": 0, "seconds": 0.0})
+			slot["attempts"] += 1
+			slot["seconds"] = round(slot["seconds"] + a["seconds"], 4)
+		winners: Dict[str, int] = {}
+		for record in records:
+			outcome = record.get("outcome")
+			if outcome and outcome.get("approach"):
+				key = f"{outcome['region']}|{outcome['approach']}|{outcome['psm']}"
+				winners[key] = winners.get(key, 0) + 1
+		slowest = sorted(records, key=lambda r: -r["total"])[:_SLOWEST]
+		timed_out = {
+			r["image"]: r["outcome"]["timed_out"] for r in records
+			if r.get("outcome") and r["outcome"].get("timed_out")
+		}
+		return {
+			"images": len(records),
+			"wall_seconds": round(time.perf_counter() - self._start, 3),
+			"stage_seconds": {k: round(v, 3) for k, v in sorted(stage_totals.items(), key=lambda kv: -kv[1])},
+			"attempts": len(attempts),
+			"wasted_attempts": len(wasted),
+			"wasted_seconds": round(sum(a["seconds"] for a in wasted), 3),
+			"wasted_by_combination": dict(sorted(wasted_by_combo.items(), key=lambda kv: -kv[1]["seconds"])),
+			"winning_configurations": dict(sorted(winners.items(), key=lambda kv: -kv[1])),
+			"slowest_images": [
+				{"image": r["image"], "total": r["total"], "stages": r["stages"], "attempts": len(r["attempts"]), "outcome": r.get("outcome")}
+				for r in slowest
+			],
+			"timed_out": dict(sorted(timed_out.items())),
+		}
+
+	def save(self) -> None:
+		write_json(self.path, {"summary": self.summary(), "images": [self.images[k] for k in sorted(self.images)]})
+		csv_path = os.path.splitext(self.path)[0] + ".csv"
+		with open(csv_path, "w", newline="", encoding="utf-8") as f:
+			w = csv.DictWriter(f, fieldnames=_ATTEMPT_COLUMNS, extrasaction="ignore")
+			w.writeheader()
+			for image in sorted(self.images):
+				for attempt in self.images[image]["attempts"]:
+					w.writerow({"image": image, **attempt})
@@ -1,7 +1,9 @@
-from typing import List, Dict
+from typing import Dict, Iterable, Iterator, List
 import csv
+import json
 from jinja2 import Template
 import os
+from src.thumbs import THUMB_SIZES
 
 _HTML = """
 <!doctype html>
@@ -94,13 +96,28 @@ const grid = document.getElementById('grid');
 const q = document.getElementById('q');
 const count = document.getElementById('count');
 
+// Thumbnail widths per size, see src/thumbs.py
+const THUMB_WIDTHS = {{ thumb_widths | safe }};
+const THUMB_SIZES_ATTR = '(max-width: 600px) 100vw, 320px';
+
+function srcset(it, ext) {
+  if (!it.thumbs) return '';
+  return Object.keys(THUMB_WIDTHS)
+    .filter(size => it.thumbs[size] && it.thumbs[size][ext])
+    .map(size => `${it.thumbs[size][ext]} ${THUMB_WIDTHS[size]}w`)
+    .join(', ');
+}
+
 function render(items) {
   grid.innerHTML = '';
   items.forEach((it, index) => {
     const div = document.createElement('div');
     div.className = 'card';
     div.innerHTML = `
-      <img src="${it.thumb || ''}" alt="${it.article || it.name || ''}" />
+      <picture>
+        <source type="image/webp" srcset="${srcset(it, 'webp')}" sizes="${THUMB_SIZES_ATTR}" />
+        <img src="${it.thumb || ''}" srcset="${srcset(it, 'jpg')}" sizes="${THUMB_SIZES_ATTR}" loading="lazy" alt="${it.article || it.name || ''}" />
+      </picture>
       <h3>${it.article || it.name || 'No Article'}</h3>
       <div class="meta">
         <strong>Colour:</strong> <span class="editable" contenteditable="true" data-field="colour" data-index="${index}">${it.colour || 'Not specified'}</span><br/>
@@ -261,24 +278,105 @@ render(DATA);
 """
 
 
+# Columns of a streamed CSV. A stream cannot be scanned for the union of keys
+# before the header is written, so it uses every key a matched product can
+# carry, in the same sorted order write_csv produces.
+CATALOG_FIELDS = sorted([
+	"image", "image_path", "thumb",
+	"article", "colour", "size", "pair", "name", "description", "raw_text",
+	"matched", "score", "rate_row", "duplicate_of",
+])
+
+# Stands in for the product JSON when the HTML template is rendered, so the
+# page can be split around it and the products written out one by one
+_DATA_MARKER = "__CATALOG_DATA__"
+
+
 def write_csv(items: List[Dict], path: str) -> None:
 	if not items:
 		open(path, 'w', newline='', encoding='utf-8').close()
 		return
-	fieldnames = sorted({k for it in items for k in it.keys()})
+	# The per-size thumbnail paths are for the HTML frontend only
+	fieldnames = sorted({k for it in items for k in it.keys() if k != 'thumbs'})
 	with open(path, 'w', newline='', encoding='utf-8') as f:
-		w = csv.DictWriter(f, fieldnames=fieldnames)
+		w = csv.DictWriter(f, fieldnames=fieldnames, extrasaction='ignore')
 		w.writeheader()
 		for it in items:
 			w.writerow(it)
 
 
-def write_html(items: List[Dict], path: str) -> None:
-	import json
-	payload = [{k: v for k, v in it.items() if k != 'image_path'} for it in items]
-	t = Template(_HTML)
-	html = t.render(data_json=json.dumps(payload))
-	with open(path, 'w', encoding='utf-8') as f:
-		f.write(html)
+class CsvStreamWriter:
+	"""Appends products to a CSV as they arrive, flushing after every row.
+
+	With ``append=True`` rows are added to an existing file written with the
+	same fieldnames, and no header is written.
+	"""
+
+	def __init__(self, path: str, fieldnames: List[str] = CATALOG_FIELDS, append: bool = False):
+		self._f = open(path, 'a' if append else 'w', newline='', encoding='utf-8')
+		self._w = csv.DictWriter(self._f, fieldnames=fieldnames, extrasaction='ignore')
+		if not append:
+			self._w.writeheader()
+		self.count = 0
+
+	def write(self, item: Dict) -> None:
+		self._w.writerow(item)
+		self._f.flush()
+		self.count += 1
+
+	def close(self) -> None:
+		self._f.close()
+
+	def __enter__(self) -> "CsvStreamWriter":
+		return self
 
+	def __exit__(self, *exc) -> None:
+		self.close()
 
+
+class JsonlStreamWriter:
+	"""Appends products to a JSON-lines file, one object per line."""
+
+	def __init__(self, path: str):
+		self._f = open(path, 'w', encoding='utf-8')
+		self.count = 0
+
+	def write(self, item: Dict) -> None:
+		self._f.write(json.dumps(item, ensure_ascii=False, default=str))
+		self._f.write("\n")
+		self._f.flush()
+		self.count += 1
+
+	def close(self) -> None:
+		self._f.close()
+
+	def __enter__(self) -> "JsonlStreamWriter":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
+
+
+def read_jsonl(path: str) -> Iterator[Dict]:
+	with open(path, 'r', encoding='utf-8') as f:
+		for line in f:
+			line = line.strip()
+			if line:
+				yield json.loads(line)
+
+
+def write_html(items: Iterable[Dict], path: str) -> None:
+	# The product array is written one item at a time between the two halves
+	# of the rendered page, so items can be a generator (e.g. read_jsonl) and
+	# the page is never built as one string
+	t = Template(_HTML)
+	head, tail = t.render(data_json=_DATA_MARKER, thumb_widths=json.dumps(THUMB_SIZES)).split(_DATA_MARKER, 1)
+	with open(path, 'w', encoding='utf-8') as f:
+		f.write(head)
+		f.write("[")
+		for i, it in enumerate(items):
+			if i:
+				f.write(", ")
+			f.write(json.dumps({k: v for k, v in it.items() if k != 'image_path'}, default=str))
+		f.write("]")
+		f.write(tail)
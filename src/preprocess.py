@@ -0,0 +1,294 @@
+import math
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageEnhance, ImageOps
+
+
+def open_upright(path: str, draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+	"""Decode the image at ``path`` and turn it upright.
+
+	Phone photos are often stored sideways with an EXIF orientation tag; the
+	pixels are rotated here, once, so OCR and the thumbnails see the same
+	upright image. With ``draft_size``, JPEGs are decoded at a reduced scale
+	no smaller than that (see Image.draft).
+	"""
+	img = Image.open(path)
+	try:
+		if draft_size is not None:
+			img.draft("RGB", draft_size)
+		# load() decodes the pixels and releases the file handle
+		img.load()
+		# A no-op without an orientation tag; no copy of the pixels is kept
+		ImageOps.exif_transpose(img, in_place=True)
+	except Exception:
+		img.close()
+		raise
+	return img
+
+
+def _convert(img: Image.Image, mode: str) -> Image.Image:
+	return img if img.mode == mode else img.convert(mode)
+
+
+def _rgba_rgb(prepared: "PreparedImage") -> Image.Image:
+	# RGB -> RGBA -> RGB is a no-op on the pixels, so reuse the RGB variant
+	if prepared.base.mode == "RGB":
+		return prepared.variant("rgb")
+	return prepared.base.convert("RGBA").convert("RGB")
+
+
+# The NumPy variants below work on the grayscale pixels as one uint8 array
+# (PreparedImage.gray_array) and only go back to a PIL image at the end. They
+# are whole-array operations: no per-pixel Python and no OpenCV dependency.
+
+# upscale2x leaves images whose longest side is already this large alone:
+# their text is big enough for tesseract and the copy would be huge
+_UPSCALE_MAX_SIDE = 2000
+
+
+def otsu_threshold(gray: np.ndarray) -> int:
+	"""Otsu's global threshold of a uint8 image: the level that maximises the
+	between-class variance of the dark and bright pixels."""
+	hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+	weight = np.cumsum(hist)  # pixels at or below each level
+	mass = np.cumsum(hist * np.arange(256))
+	total, total_mass = weight[-1], mass[-1]
+	with np.errstate(divide="ignore", invalid="ignore"):
+		between = (total_mass * weight - total * mass) ** 2 / (weight * (total - weight))
+	between[~np.isfinite(between)] = 0.0
+	return int(np.argmax(between))
+
+
+def _otsu(gray: np.ndarray) -> np.ndarray:
+	# Black text on white, whatever the lighting of the card
+	return np.where(gray > otsu_threshold(gray), 255, 0).astype(np.uint8)
+
+
+def _equalize(gray: np.ndarray) -> np.ndarray:
+	# Histogram equalisation through a 256-entry lookup table
+	hist = np.bincount(gray.ravel(), minlength=256)
+	cdf = np.cumsum(hist)
+	cdf_min = cdf[np.flatnonzero(hist)[0]]
+	span = cdf[-1] - cdf_min
+	if span == 0:
+		# A single grey level; nothing to spread
+		return gray
+	lut = np.clip(np.round((cdf - cdf_min) * 255.0 / span), 0, 255).astype(np.uint8)
+	return lut[gray]
+
+
+def _upscale2x(gray: np.ndarray) -> np.ndarray:
+	# Bilinear 2x: original pixels on the even rows/columns, the mean of their
+	# neighbours in between (the last row/column is repeated)
+	a = gray.astype(np.uint16)
+	height, width = a.shape
+	rows = np.empty((height * 2, width), dtype=np.uint16)
+	rows[0::2] = a
+	rows[1:-1:2] = (a[:-1] + a[1:] + 1) >> 1
+	rows[-1] = a[-1]
+	out = np.empty((height * 2, width * 2), dtype=np.uint16)
+	out[:, 0::2] = rows
+	out[:, 1:-1:2] = (rows[:, :-1] + rows[:, 1:] + 1) >> 1
+	out[:, -1] = rows[:, -1]
+	return out.astype(np.uint8)
+
+
+def _denoise(gray: np.ndarray) -> np.ndarray:
+	# 3x3 median: removes JPEG speckle and sensor noise but keeps stroke
+	# edges, unlike a blur. The nine shifted views are stacked and the middle
+	# value picked with a partial sort.
+	height, width = gray.shape
+	padded = np.pad(gray, 1, mode="edge")
+	stack = np.stack([padded[y:y + height, x:x + width] for y in range(3) for x in range(3)])
+	return np.partition(stack, 4, axis=0)[4]
+
+
+def _from_gray(fn: Callable[[np.ndarray], np.ndarray]) -> Callable[["PreparedImage"], Image.Image]:
+	def variant(prepared: "PreparedImage") -> Image.Image:
+		return Image.fromarray(fn(prepared.gray_array), "L")
+	return variant
+
+
+def _upscale(prepared: "PreparedImage") -> Image.Image:
+	if max(prepared.base.size) > _UPSCALE_MAX_SIDE:
+		# The very gray image, so the search sees it as already tried
+		return prepared.variant("gray")
+	return _from_gray(_upscale2x)(prepared)
+
+
+# Preprocessing variants by name. Each derives its image from the shared decoded
+# buffer (or from another variant) and is only computed when first requested.
+# The first six are the PIL chain the pipeline searches by default; the NumPy
+# ones are opted into with OcrOptions.approaches (--ocr_approaches), see
+# benchmark_preprocess.py for how they compare.
+VARIANTS: Dict[str, Callable[["PreparedImage"], Image.Image]] = {
+	"original": lambda p: p.base,
+	"rgb": lambda p: _convert(p.base, "RGB"),
+	"gray": lambda p: _convert(p.base, "L"),
+	"rgba_rgb": _rgba_rgb,
+	"contrast": lambda p: ImageEnhance.Contrast(p.variant("gray")).enhance(2.0),
+	"sharpen": lambda p: ImageEnhance.Sharpness(p.variant("gray")).enhance(2.0),
+	"otsu": _from_gray(_otsu),
+	"equalize": _from_gray(_equalize),
+	"upscale2x": _upscale,
+	"denoise": _from_gray(_denoise),
+}
+
+
+# Label detection works on a downscaled copy with this longest side, split
+# into square tiles of _ROI_TILE pixels
+_ROI_WORK_SIZE = 480
+_ROI_TILE = 8
+
+
+def _tile_mean(mask: np.ndarray, tile: int) -> np.ndarray:
+	th, tw = mask.shape[0] // tile, mask.shape[1] // tile
+	return mask[:th * tile, :tw * tile].reshape(th, tile, tw, tile).mean(axis=(1, 3))
+
+
+def _components(grid: np.ndarray):
+	# 4-connected components of a small boolean tile grid
+	seen = np.zeros_like(grid)
+	height, width = grid.shape
+	for y, x in zip(*np.nonzero(grid)):
+		if seen[y, x]:
+			continue
+		seen[y, x] = True
+		stack, cells = [(y, x)], []
+		while stack:
+			cy, cx = stack.pop()
+			cells.append((cy, cx))
+			for ny, nx in ((cy - 1, cx), (cy + 1, cx), (cy, cx - 1), (cy, cx + 1)):
+				if 0 <= ny < height and 0 <= nx < width and grid[ny, nx] and not seen[ny, nx]:
+					seen[ny, nx] = True
+					stack.append((ny, nx))
+		yield cells
+
+
+def find_label_roi(img: Image.Image, margin: int = 1) -> Optional[Tuple[int, int, int, int]]:
+	"""Locate the printed text label in a product photo.
+
+	The labels are dark text on a white/light-grey card, so tiles that are
+	mostly bright and unsaturated, contain some dark pixels and have a high
+	density of strong edges are marked as label tiles. The connected group of
+	such tiles with the most edge mass wins. Returns a ``(left, top, right,
+	bottom)`` box in full-resolution pixels, or None when nothing plausible is
+	found (the caller then OCRs the full frame).
+	"""
+	width, height = img.size
+	factor = max(1, math.ceil(max(width, height) / _ROI_WORK_SIZE))
+	small = img.convert("RGB") if img.mode != "RGB" else img
+	if factor > 1:
+		small = small.reduce(factor)
+	rgb = np.asarray(small, dtype=np.int16)
+	gray = rgb.mean(axis=2)
+	saturation = rgb.max(axis=2) - rgb.min(axis=2)
+
+	edges = np.zeros(gray.shape, dtype=bool)
+	edges[:, 1:] |= np.abs(np.diff(gray, axis=1)) > 40
+	edges[1:, :] |= np.abs(np.diff(gray, axis=0)) > 40
+
+	bright = _tile_mean((gray > 190) & (saturation < 50), _ROI_TILE)
+	dark = _tile_mean(gray < 110, _ROI_TILE)
+	edge_density = _tile_mean(edges, _ROI_TILE)
+	label = (bright > 0.35) & (dark > 0.03) & (edge_density > 0.08)
+	if not label.any():
+		return None
+
+	# Grow by one tile so gaps between words and lines join into one block
+	grown = label.copy()
+	grown[1:, :] |= label[:-1, :]
+	grown[:-1, :] |= label[1:, :]
+	grown[:, 1:] |= label[:, :-1]
+	grown[:, :-1] |= label[:, 1:]
+
+	best, best_weight = None, 0.0
+	for cells in _components(grown):
+		weight = sum(edge_density[c] for c in cells if label[c])
+		if weight > best_weight:
+			best, best_weight = cells, weight
+	if best is None:
+		return None
+
+	ys = [c[0] for c in best]
+	xs = [c[1] for c in best]
+	tiles_h, tiles_w = label.shape
+	scale = _ROI_TILE * factor
+	box = (
+		int(max(0, min(xs) - margin) * scale),
+		int(max(0, min(ys) - margin) * scale),
+		int(min(width, min(tiles_w, max(xs) + 1 + margin) * scale)),
+		int(min(height, min(tiles_h, max(ys) + 1 + margin) * scale)),
+	)
+	# A "label" covering most of the frame, or a speck, is not a label
+	area = (box[2] - box[0]) * (box[3] - box[1])
+	if area > 0.6 * width * height or area < 0.005 * width * height:
+		return None
+	return box
+
+
+class PreparedImage:
+	"""An image decoded once, with preprocessing variants derived on demand.
+
+	Use it as a context manager so the decoded buffer and every derived variant
+	are released as soon as OCR of the image is finished.
+	"""
+
+	def __init__(self, path: str, base: Optional[Image.Image] = None):
+		self.path = path
+		self._base = base
+		self._error = None
+		self._variants: Dict[str, Image.Image] = {}
+		self._gray_array: Optional[np.ndarray] = None
+
+	@property
+	def base(self) -> Image.Image:
+		if self._base is None:
+			# A file that failed to decode fails the same way every time
+			if self._error is not None:
+				raise self._error
+			try:
+				self._base = open_upright(self.path)
+			except Exception as e:
+				self._error = e
+				raise
+		return self._base
+
+	def variant(self, name: str) -> Image.Image:
+		img = self._variants.get(name)
+		if img is None:
+			img = VARIANTS[name](self)
+			self._variants[name] = img
+		return img
+
+	@property
+	def gray_array(self) -> np.ndarray:
+		# The grayscale pixels as a uint8 array, copied out of PIL once and
+		# shared by every NumPy variant
+		if self._gray_array is None:
+			self._gray_array = np.asarray(self.variant("gray"), dtype=np.uint8)
+		return self._gray_array
+
+	def crop(self, box: Tuple[int, int, int, int]) -> "PreparedImage":
+		# A region of this image that derives its own variants from the crop.
+		# It owns its pixels, so it can be closed independently of the parent.
+		return PreparedImage(self.path, base=self.base.crop(box))
+
+	def loaded_variants(self) -> List[str]:
+		return list(self._variants)
+
+	def close(self) -> None:
+		seen = set()
+		for img in [*self._variants.values(), self._base]:
+			if img is not None and id(img) not in seen:
+				seen.add(id(img))
+				img.close()
+		self._variants.clear()
+		self._gray_array = None
+		self._base = None
+
+	def __enter__(self) -> "PreparedImage":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()
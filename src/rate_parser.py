@@ -1,48 +1,193 @@
-from typing import List, Dict
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Iterator, List, Dict, Optional, Tuple
 import pdfplumber
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import pytesseract
 from PIL import Image
 import os
+from src.ocr_cache import META_KEY, load_entry, refresh_stamp, source_stamp, write_json
+from src.tesseract import tesseract_cmd
 
+# Bump whenever the rows parse_rate_list produces for the same PDF change
+# (table handling, OCR fallback, column naming); cached rows are then
+# parsed again
+RATE_PARSER_VERSION = 2
 
-def _parse_tables_with_pdfplumber(pdf_path: str) -> List[Dict]:
+# File name of the parsed rows in the output directory
+RATE_CACHE_NAME = "rate_list.json"
+
+# Pages per worker task are chosen so each worker gets about this many
+# ranges: a few slow pages then do not leave the other workers idle, and
+# every range pays for opening the PDF only once
+_RANGES_PER_WORKER = 2
+
+# Scanned rate lists are rasterised one page at a time, in grayscale, at the
+# resolution tesseract reads body text best at (pdf2image's default is 200)
+_FALLBACK_DPI = 300
+
+# Pages OCR'd ahead per worker; rows are handed on in page order, so this
+# bounds how far one slow page lets the others run ahead
+_PAGES_AHEAD = 2
+
+
+def _page_rows(page) -> List[Dict]:
+	rows: List[Dict] = []
+	tables = page.extract_tables() or []
+	for table in tables:
+		# assume first row is header
+		if not table:
+			continue
+		header = [ (c or "").strip() for c in table[0] ]
+		for r in table[1:]:
+			cells = [ (c or "").strip() for c in r ]
+			row = { f"col_{i}": cells[i] if i < len(cells) else "" for i in range(len(header)) }
+			row["raw"] = " | ".join(cells)
+			rows.append(row)
+	return rows
+
+
+def _parse_page_range(pdf_path: str, start: int, stop: int) -> List[Dict]:
+	# Module-level so it can run in worker processes: each opens the PDF
+	# itself and lays out only pages [start, stop)
 	rows: List[Dict] = []
 	with pdfplumber.open(pdf_path) as pdf:
-		for page in pdf.pages:
-			tables = page.extract_tables() or []
-			for table in tables:
-				# assume first row is header
-				if not table:
-					continue
-				header = [ (c or "").strip() for c in table[0] ]
-				for r in table[1:]:
-					cells = [ (c or "").strip() for c in r ]
-					row = { f"col_{i}": cells[i] if i < len(cells) else "" for i in range(len(header)) }
-					row["raw"] = " | ".join(cells)
-					rows.append(row)
+		for page in pdf.pages[start:stop]:
+			rows.extend(_page_rows(page))
+			# Drop the page's parsed layout before the next one
+			page.close()
 	return rows
 
 
-def _fallback_ocr(pdf_path: str) -> List[Dict]:
+def _page_ranges(pages: int, workers: int) -> List[Tuple[int, int]]:
+	size = max(1, -(-pages // (workers * _RANGES_PER_WORKER)))
+	return [(start, min(start + size, pages)) for start in range(0, pages, size)]
+
+
+def _parse_tables_with_pdfplumber(pdf_path: str, workers: int = 1) -> List[Dict]:
+	# Table layout analysis is CPU-bound and independent per page, so with
+	# several workers page ranges go to a process pool; rows come back in
+	# page order either way
+	if workers is not None and workers <= 0:
+		workers = os.cpu_count() or 1
+	with pdfplumber.open(pdf_path) as pdf:
+		pages = len(pdf.pages)
+	if workers <= 1 or pages <= 1:
+		return _parse_page_range(pdf_path, 0, pages)
+	ranges = _page_ranges(pages, workers)
 	rows: List[Dict] = []
-	images = convert_from_path(pdf_path)
-	for img in images:
-		text = pytesseract.image_to_string(img)
-		for line in text.splitlines():
-			line = line.strip()
-			if not line:
-				continue
-			rows.append({"raw": line})
+	with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+		futures = [pool.submit(_parse_page_range, pdf_path, start, stop) for start, stop in ranges]
+		for future in futures:
+			rows.extend(future.result())
 	return rows
 
 
-def parse_rate_list(pdf_path: str) -> List[Dict]:
-	if not os.path.exists(pdf_path):
-		raise FileNotFoundError(pdf_path)
-	rows = _parse_tables_with_pdfplumber(pdf_path)
-	if rows:
-		return rows
-	return _fallback_ocr(pdf_path)
+def _ocr_page(pdf_path: str, page: int) -> List[Dict]:
+	# Module-level for the worker pool: rasterise only this page (1-based)
+	# and OCR it, so no more than one page image is in memory per process
+	rows: List[Dict] = []
+	images = convert_from_path(pdf_path, dpi=_FALLBACK_DPI, first_page=page, last_page=page, grayscale=True)
+	try:
+		for img in images:
+			text = pytesseract.image_to_string(img)
+			for line in text.splitlines():
+				line = line.strip()
+				if not line:
+					continue
+				rows.append({"raw": line})
+	finally:
+		for img in images:
+			img.close()
+	return rows
+
+
+def _use_tesseract_cmd() -> None:
+	# The binary the OCR engines use (TESSERACT_CMD, PATH or the default
+	# Windows install). The rate list may be parsed before any engine has
+	# set it, and spawned workers start without it.
+	pytesseract.pytesseract.tesseract_cmd = tesseract_cmd()
+
+
+def _init_ocr_worker() -> None:
+	# Pool initializer. With one page per core, tesseract's own OpenMP
+	# threads would only compete for the same cores.
+	_use_tesseract_cmd()
+	os.environ["OMP_THREAD_LIMIT"] = "1"
+
 
+def _iter_fallback_ocr(pdf_path: str, workers: int = 1) -> Iterator[Dict]:
+	# OCR'd text lines of every page, in page order, yielded as each page is
+	# done. Several workers OCR the next pages meanwhile, at most
+	# _PAGES_AHEAD per worker beyond the page being handed on.
+	if workers is not None and workers <= 0:
+		workers = os.cpu_count() or 1
+	pages = int(pdfinfo_from_path(pdf_path)["Pages"])
+	_use_tesseract_cmd()
+	if workers <= 1 or pages <= 1:
+		for page in range(1, pages + 1):
+			yield from _ocr_page(pdf_path, page)
+		return
+	window: Deque = deque()
+	with ProcessPoolExecutor(max_workers=min(workers, pages), initializer=_init_ocr_worker) as pool:
+		try:
+			page = 1
+			while window or page <= pages:
+				while page <= pages and len(window) < workers * _PAGES_AHEAD:
+					window.append(pool.submit(_ocr_page, pdf_path, page))
+					page += 1
+				yield from window.popleft().result()
+		finally:
+			# Also when the caller stops early: queued pages are not started
+			for future in window:
+				future.cancel()
 
+
+def _cached_rows(pdf_path: str, cache_path: str) -> Optional[List[Dict]]:
+	# The rows stored for this exact PDF by this parser version, else None.
+	# The PDF is only re-hashed when its size or mtime changed.
+	entry = load_entry(cache_path)
+	if not entry or not isinstance(entry.get("rows"), list):
+		return None
+	meta = entry.get(META_KEY) or {}
+	if meta.get("parser_version") != RATE_PARSER_VERSION:
+		return None
+	unchanged, stamp = refresh_stamp(meta.get("source"), pdf_path)
+	if not unchanged:
+		return None
+	if stamp is not None:
+		# Touched but not modified: store the new stat info
+		meta["source"] = stamp
+		write_json(cache_path, entry)
+	return entry["rows"]
+
+
+def parse_rate_list(pdf_path: str, cache_path: Optional[str] = None, workers: int = 1) -> List[Dict]:
+	"""Rows of the rate list PDF: its tables, else OCR'd text lines.
+
+	With ``cache_path``, the rows are stored there as JSON along with the
+	PDF's SHA-256 and RATE_PARSER_VERSION, and read back from it while both
+	still match, so an unchanged rate list never reaches pdfplumber or
+	tesseract again. ``workers`` processes (0 = one per CPU core) work on
+	different pages at once, for table extraction and for the OCR fallback
+	of scanned lists alike.
+	"""
+	if not os.path.exists(pdf_path):
+		raise FileNotFoundError(pdf_path)
+	if cache_path:
+		rows = _cached_rows(pdf_path, cache_path)
+		if rows is not None:
+			return rows
+		# Stamped before parsing, so an edit made meanwhile is not hidden
+		stamp = source_stamp(pdf_path)
+	rows = _parse_tables_with_pdfplumber(pdf_path, workers)
+	method = "tables"
+	if not rows:
+		rows = list(_iter_fallback_ocr(pdf_path, workers))
+		method = "ocr"
+	if cache_path:
+		write_json(cache_path, {
+			META_KEY: {"source": stamp, "parser_version": RATE_PARSER_VERSION, "method": method},
+			"rows": rows,
+		})
+	return rows
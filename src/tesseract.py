@@ -0,0 +1,17 @@
+import os
+import shutil
+
+# Default install location on Windows, used when TESSERACT_CMD is not set and
+# tesseract is not on PATH
+_WINDOWS_TESSERACT_CMD = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+
+
+def tesseract_cmd() -> str:
+	"""The tesseract executable to run: TESSERACT_CMD, else the one on PATH,
+	else the default Windows install location."""
+	cmd = os.environ.get("TESSERACT_CMD")
+	if cmd:
+		return cmd
+	if os.name == "nt" and not shutil.which("tesseract") and os.path.exists(_WINDOWS_TESSERACT_CMD):
+		return _WINDOWS_TESSERACT_CMD
+	return "tesseract"
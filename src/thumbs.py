@@ -0,0 +1,265 @@
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from src.ocr_cache import fingerprint, load_entry, refresh_stamp, source_stamp, write_json
+from src.preprocess import open_upright
+
+# Longest side in pixels of each thumbnail size. "card" is the size the old
+# single thumbnail had and is also written to thumbs/<fname> for the scripts
+# and cached entries that point there.
+THUMB_SIZES = {"grid": 200, "card": 400, "zoom": 800}
+LEGACY_SIZE = "card"
+
+# Encoder settings per output format, keyed by file extension
+THUMB_FORMATS = {
+	# WebP method 2 is several times faster to encode than the default 4 for
+	# a few percent in size; progressive JPEG already gets optimised Huffman
+	# tables, so optimize=True would only add a second pass
+	"webp": ("WEBP", {"quality": 80, "method": 2}),
+	"jpg": ("JPEG", {"quality": 82, "progressive": True}),
+}
+
+MANIFEST_NAME = "manifest.json"
+
+# Per thumb_dir: (manifest mtime, recorded stamps) as last read by this
+# process, plus the images FusedThumbnails has rendered here since
+_recorded_cache: Dict[str, Tuple[Optional[int], Dict[str, Dict]]] = {}
+
+
+def _settings_fingerprint() -> str:
+	# "orientation": thumbnails are rendered from the EXIF-upright image
+	return fingerprint({"sizes": THUMB_SIZES, "formats": THUMB_FORMATS, "legacy": LEGACY_SIZE, "orientation": "exif"})
+
+
+def thumb_paths(fname: str, thumb_dir: str) -> Dict[str, Dict[str, str]]:
+	# thumbs/<size>/<stem>.<ext> for every size and format
+	stem = os.path.splitext(fname)[0]
+	return {
+		size: {ext: os.path.join(thumb_dir, size, f"{stem}.{ext}") for ext in THUMB_FORMATS}
+		for size in THUMB_SIZES
+	}
+
+
+def relative_thumb_paths(fname: str, thumb_dir: str) -> Dict[str, Dict[str, str]]:
+	# thumb_paths relative to the parent of thumb_dir, as the catalog links them
+	base = os.path.dirname(thumb_dir)
+	return {
+		size: {ext: os.path.relpath(path, start=base) for ext, path in formats.items()}
+		for size, formats in thumb_paths(fname, thumb_dir).items()
+	}
+
+
+def _open_reduced(src_path: str) -> Image.Image:
+	# For JPEGs, let libjpeg scale down by 1/2, 1/4 or 1/8 while decoding
+	# (DCT-domain downscaling) instead of decoding every full-resolution
+	# pixel; draft never goes below the requested size
+	largest = max(THUMB_SIZES.values())
+	return open_upright(src_path, (largest, largest))
+
+
+def _fitted(img: Image.Image, side: int) -> Image.Image:
+	# A new image no larger than side x side, as Image.thumbnail would shrink
+	# img in place, without copying the full-size pixels first
+	scale = side / max(img.size)
+	if scale >= 1:
+		return img.copy()
+	size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+	return img.resize(size, Image.BICUBIC, reducing_gap=2.0)
+
+
+def _encode(img: Image.Image, ext: str) -> bytes:
+	fmt, params = THUMB_FORMATS[ext]
+	buf = io.BytesIO()
+	img.save(buf, fmt, **params)
+	return buf.getvalue()
+
+
+def _write_bytes(path: str, data: bytes) -> None:
+	tmp_path = f"{path}.{os.getpid()}.tmp"
+	with open(tmp_path, "wb") as f:
+		f.write(data)
+	os.replace(tmp_path, path)
+
+
+def render_thumbnails_from(fname: str, img: Image.Image, thumb_dir: str) -> None:
+	"""Write every size and format for ``fname`` from already decoded pixels.
+
+	``img`` is left as it is. Sizes are produced largest first, each
+	downscaled from the previous one, so the full-resolution pixels are only
+	touched once.
+	"""
+	paths = thumb_paths(fname, thumb_dir)
+	sizes = sorted(THUMB_SIZES.items(), key=lambda kv: -kv[1])
+	source = img if img.mode in ("RGB", "L") else img.convert("RGB")
+	current = _fitted(source, sizes[0][1])
+	try:
+		for size, side in sizes:
+			current.thumbnail((side, side))
+			for ext, path in paths[size].items():
+				data = _encode(current, ext)
+				_write_bytes(path, data)
+				if size == LEGACY_SIZE and ext == "jpg" and fname.lower().endswith((".jpg", ".jpeg")):
+					_write_bytes(os.path.join(thumb_dir, fname), data)
+			if size == LEGACY_SIZE and not fname.lower().endswith((".jpg", ".jpeg")):
+				current.save(os.path.join(thumb_dir, fname))
+	finally:
+		current.close()
+		if source is not img:
+			source.close()
+
+
+def render_thumbnails(fname: str, src_path: str, thumb_dir: str) -> None:
+	"""Decode ``src_path`` once and write every size and format for it."""
+	with _open_reduced(src_path) as img:
+		render_thumbnails_from(fname, img, thumb_dir)
+
+
+def _render_one(fname: str, images_dir: str, thumb_dir: str) -> Tuple[Optional[Dict], float]:
+	# Module-level so it can run in worker processes. Returns the stamp of the
+	# rendered source (None on failure) and the seconds it took.
+	src_path = os.path.join(images_dir, fname)
+	start = time.perf_counter()
+	try:
+		stamp = source_stamp(src_path)
+		render_thumbnails(fname, src_path, thumb_dir)
+	except Exception as e:
+		print(f"Warning: Could not create thumbnail for {src_path}: {e}")
+		stamp = None
+	return stamp, time.perf_counter() - start
+
+
+def _outputs_exist(fname: str, thumb_dir: str) -> bool:
+	paths = [p for formats in thumb_paths(fname, thumb_dir).values() for p in formats.values()]
+	return all(os.path.exists(p) for p in paths + [os.path.join(thumb_dir, fname)])
+
+
+def _make_dirs(thumb_dir: str) -> None:
+	for size in THUMB_SIZES:
+		os.makedirs(os.path.join(thumb_dir, size), exist_ok=True)
+
+
+def _recorded(thumb_dir: str) -> Dict[str, Dict]:
+	# The manifest's stamps under the current settings, read again only when
+	# the file changes
+	path = os.path.join(thumb_dir, MANIFEST_NAME)
+	try:
+		mtime = os.stat(path).st_mtime_ns
+	except OSError:
+		mtime = None
+	cached = _recorded_cache.get(thumb_dir)
+	if cached is None or cached[0] != mtime:
+		manifest = (load_entry(path) or {}) if mtime is not None else {}
+		images = manifest.get("images", {}) if manifest.get("settings") == _settings_fingerprint() else {}
+		cached = (mtime, dict(images))
+		_recorded_cache[thumb_dir] = cached
+	return cached[1]
+
+
+class FusedThumbnails:
+	"""Thumbnails of one image, rendered from pixels decoded for OCR.
+
+	The OCR search calls it with the upright image as soon as it has decoded
+	it, so a cold run decodes every photo once instead of once for OCR and
+	again for the thumbnails. It renders only when the thumbnails on disk are
+	missing or out of date, and at most once; ``ready`` then tells
+	generate_thumbnails (through its ``rendered`` argument) that the image
+	needs nothing more. Failures are left for generate_thumbnails to retry.
+	"""
+
+	def __init__(self, fname: str, thumb_dir: str, stamp: Dict):
+		self.fname = fname
+		self.thumb_dir = thumb_dir
+		self.stamp = stamp
+		record = _recorded(thumb_dir).get(fname) or {}
+		self.ready = record.get("sha256") == stamp.get("sha256") and _outputs_exist(fname, thumb_dir)
+
+	def __call__(self, img: Image.Image) -> None:
+		if self.ready:
+			return
+		try:
+			_make_dirs(self.thumb_dir)
+			render_thumbnails_from(self.fname, img, self.thumb_dir)
+		except Exception as e:
+			print(f"Warning: Could not create thumbnail for {self.fname}: {e}")
+			return
+		self.ready = True
+		# Later searches of this image in this process (a batched first pass
+		# and then the full search) do not render it again
+		_recorded(self.thumb_dir)[self.fname] = self.stamp
+
+
+def generate_thumbnails(images_dir: str, thumb_dir: str, fnames: List[str], workers: int = 1, report=None, rendered: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict[str, Dict[str, str]]]:
+	"""Bring the thumbnails of ``fnames`` up to date.
+
+	Thumbnails are only rendered again when the source bytes change (tracked
+	by SHA-256 in thumbs/manifest.json), when the size/format settings change,
+	or when an output file is missing. ``rendered`` maps images whose
+	thumbnails were already rendered this run (FusedThumbnails) to their
+	source stamps; they are only recorded. Returns, per image that has
+	thumbnails, ``{size: {ext: path}}`` with paths relative to the parent of
+	thumb_dir. Render times go to ``report`` (an OcrRunReport) as the
+	``thumbnail`` stage.
+	"""
+	_make_dirs(thumb_dir)
+	manifest_path = os.path.join(thumb_dir, MANIFEST_NAME)
+	manifest = load_entry(manifest_path) or {}
+	settings = _settings_fingerprint()
+	recorded = manifest.get("images", {}) if manifest.get("settings") == settings else {}
+	sources: Dict[str, Dict] = {}
+	pending: List[str] = []
+	dirty = manifest.get("settings") != settings
+
+	rendered = rendered or {}
+	for fname in fnames:
+		src_path = os.path.join(images_dir, fname)
+		if fname in rendered and _outputs_exist(fname, thumb_dir):
+			sources[fname] = rendered[fname]
+			dirty = True
+			continue
+		if fname in recorded and _outputs_exist(fname, thumb_dir):
+			unchanged, stamp = refresh_stamp(recorded[fname], src_path)
+			if unchanged:
+				sources[fname] = stamp or recorded[fname]
+				dirty = dirty or stamp is not None
+				continue
+		pending.append(fname)
+
+	if workers is not None and workers <= 0:
+		workers = os.cpu_count() or 1
+
+	if workers <= 1 or len(pending) <= 1:
+		for fname in pending:
+			stamp, seconds = _render_one(fname, images_dir, thumb_dir)
+			if report is not None:
+				report.add_stage(fname, "thumbnail", seconds)
+			if stamp is not None:
+				sources[fname] = stamp
+	else:
+		with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+			futures = {pool.submit(_render_one, fname, images_dir, thumb_dir): fname for fname in pending}
+			for future in as_completed(futures):
+				fname = futures[future]
+				try:
+					stamp, seconds = future.result()
+				except Exception as e:
+					print(f"Warning: Thumbnail worker failed for {fname}: {e}")
+					continue
+				if report is not None:
+					report.add_stage(fname, "thumbnail", seconds)
+				if stamp is not None:
+					sources[fname] = stamp
+
+	# Images outside fnames (a partial run) keep their record while the source
+	# is still there; records of deleted sources are dropped
+	requested = set(fnames)
+	kept = {
+		fname: stamp for fname, stamp in recorded.items()
+		if fname not in requested and os.path.exists(os.path.join(images_dir, fname))
+	}
+	if pending or dirty or set(recorded) - set(sources) - set(kept):
+		write_json(manifest_path, {"settings": settings, "images": dict(sorted({**kept, **sources}.items()))})
+
+	return {fname: relative_thumb_paths(fname, thumb_dir) for fname in fnames if fname in sources}
@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+try:
+	from watchdog.events import FileSystemEventHandler
+	from watchdog.observers import Observer
+except ImportError:
+	FileSystemEventHandler = object
+	Observer = None
+from src.matching import RateIndex, iter_match_products
+from src.ocr_cache import refresh_stamp, source_stamp
+from src.ocr_parser import list_images, ocr_images_to_products
+from src.output import CsvStreamWriter, write_html
+from src.rate_parser import RATE_CACHE_NAME, parse_rate_list
+
+# size and mtime of every image in the folder, by file name
+Snapshot = Dict[str, Tuple[int, int]]
+
+# How long the folder has to stay unchanged before a batch is processed, so
+# a photo still being copied in is not OCR'd half written
+_SETTLE_SECONDS = 1.0
+
+
+def _snapshot(images_dir: str) -> Snapshot:
+	snap: Snapshot = {}
+	for fname in list_images(images_dir):
+		try:
+			st = os.stat(os.path.join(images_dir, fname))
+		except OSError:
+			continue
+		snap[fname] = (st.st_size, st.st_mtime_ns)
+	return snap
+
+
+class _Wakeup(FileSystemEventHandler):
+	# Any filesystem event under a watched folder just wakes the main loop,
+	# which then works out what changed from a fresh snapshot
+	def __init__(self, event: threading.Event):
+		super().__init__()
+		self.event = event
+
+	def on_any_event(self, event) -> None:
+		self.event.set()
+
+
+class CatalogWatcher:
+	"""Keeps catalog.csv/catalog.html up to date with images_dir and the rate list.
+
+	The matched products are held in memory by file name. When images are
+	added or replaced only those files go through OCR (cache validation does
+	the rest) and only they are re-matched; removed images are dropped. A
+	changed rate list is parsed again and every product is re-matched, without
+	any OCR. Change notifications come from inotify (or the platform
+	equivalent) through the optional watchdog package; without it the folder
+	is polled every ``poll_interval`` seconds.
+	"""
+
+	def __init__(self, images_dir: str, rate_list: str, out_dir: str, cache_dir: str, thumb_dir: str, ocr_args: Dict, poll_interval: float = 2.0):
+		self.images_dir = images_dir
+		self.rate_list = rate_list
+		self.cache_dir = cache_dir
+		self.thumb_dir = thumb_dir
+		self.ocr_args = ocr_args
+		self.poll_interval = poll_interval
+		self.csv_path = os.path.join(out_dir, "catalog.csv")
+		self.html_path = os.path.join(out_dir, "catalog.html")
+		self.rate_cache = os.path.join(out_dir, RATE_CACHE_NAME)
+		self.products: Dict[str, Dict] = {}
+		self.snapshot: Snapshot = {}
+		self.rate_stamp: Optional[Dict] = None
+		self.index = RateIndex([])
+		self._wake = threading.Event()
+
+	def _ocr(self, fnames: List[str]) -> List[Dict]:
+		return ocr_images_to_products(self.images_dir, self.cache_dir, self.thumb_dir, fnames=fnames, **self.ocr_args)
+
+	def _load_rates(self) -> Dict:
+		# Returns the stamp of the rate list as parsed. It is taken before
+		# parsing, so an edit made meanwhile shows up as a change next time;
+		# the caller records it once the whole update has worked.
+		stamp = source_stamp(self.rate_list)
+		self.index = RateIndex(parse_rate_list(self.rate_list, self.rate_cache, workers=self.ocr_args.get("workers", 1)))
+		print(f"  Rate rows: {len(self.index.rows)}")
+		return stamp
+
+	def _rematch(self, products: List[Dict]) -> List[Dict]:
+		matched = list(iter_match_products(products, self.index))
+		for item in matched:
+			self.products[item["image"]] = item
+		return matched
+
+	def _write_all(self) -> None:
+		items = [self.products[fname] for fname in sorted(self.products)]
+		with CsvStreamWriter(self.csv_path) as out:
+			for item in items:
+				out.write(item)
+		write_html(items, self.html_path)
+
+	def _write_update(self, added: List[Dict], rewrite: bool) -> None:
+		# New images whose names sort after every existing one (the usual case
+		# for WhatsApp exports) are appended to the CSV; anything else rewrites
+		# it. The HTML page embeds the whole product list, so it is always
+		# regenerated, but from memory, without OCR or matching.
+		if not rewrite and added and os.path.exists(self.csv_path):
+			with CsvStreamWriter(self.csv_path, append=True) as out:
+				for item in sorted(added, key=lambda it: it["image"]):
+					out.write(item)
+			write_html([self.products[fname] for fname in sorted(self.products)], self.html_path)
+		else:
+			self._write_all()
+
+	def build(self) -> None:
+		print("[watch] Initial build ...")
+		rate_stamp = self._load_rates()
+		snap = _snapshot(self.images_dir)
+		self._rematch(self._ocr(sorted(snap)))
+		self._write_all()
+		self.rate_stamp, self.snapshot = rate_stamp, snap
+		print(f"[watch] {len(self.products)} products in catalog")
+
+	def _rates_changed(self) -> bool:
+		unchanged, stamp = refresh_stamp(self.rate_stamp, self.rate_list)
+		if unchanged and stamp is not None:
+			self.rate_stamp = stamp
+		return not unchanged and os.path.exists(self.rate_list)
+
+	def update(self) -> bool:
+		"""Apply whatever changed since the last call. Returns True if it did anything."""
+		rates_changed = self._rates_changed()
+		snap = _snapshot(self.images_dir)
+		changed = sorted(f for f, st in snap.items() if self.snapshot.get(f) != st)
+		removed = sorted(set(self.snapshot) - set(snap))
+		if not (rates_changed or changed or removed):
+			return False
+
+		last = max(self.products) if self.products else ""
+		rewrite = bool(removed) or rates_changed or any(f in self.products or f < last for f in changed)
+		for fname in removed:
+			self.products.pop(fname, None)
+		if rates_changed:
+			print("[watch] Rate list changed, re-matching every product ...")
+			rate_stamp = self._load_rates()
+			others = [p for f, p in self.products.items() if f not in changed]
+			self._rematch(others)
+		added: List[Dict] = []
+		if changed:
+			print(f"[watch] {len(changed)} new or changed image(s): {', '.join(changed[:5])}{' ...' if len(changed) > 5 else ''}")
+			added = self._rematch(self._ocr(changed))
+		if removed:
+			print(f"[watch] {len(removed)} image(s) removed")
+		self._write_update(added, rewrite)
+		# Only now that the catalog is written: if anything above failed, the
+		# snapshot and rate stamp still differ from the folder, so the next
+		# call picks up the same changes again
+		self.snapshot = snap
+		if rates_changed:
+			self.rate_stamp = rate_stamp
+		print(f"[watch] {len(self.products)} products in catalog")
+		return True
+
+	def _wait_for_change(self, sleep: Callable[[float], None]) -> None:
+		# Block until something happens (or one poll interval passes), then
+		# wait for the folder to settle so a burst of copies is one batch
+		self._wake.wait(self.poll_interval)
+		self._wake.clear()
+		previous = _snapshot(self.images_dir)
+		if previous == self.snapshot:
+			# Nothing in the folder moved; update() still checks the rate list
+			return
+		while True:
+			sleep(_SETTLE_SECONDS)
+			current = _snapshot(self.images_dir)
+			if current == previous:
+				return
+			previous = current
+
+	def _start_observer(self):
+		if Observer is None:
+			print(f"[watch] watchdog not installed, polling every {self.poll_interval}s")
+			return None
+		observer = Observer()
+		handler = _Wakeup(self._wake)
+		observer.schedule(handler, self.images_dir, recursive=False)
+		rate_dir = os.path.dirname(os.path.abspath(self.rate_list))
+		if os.path.abspath(rate_dir) != os.path.abspath(self.images_dir):
+			observer.schedule(handler, rate_dir, recursive=False)
+		observer.start()
+		return observer
+
+	def run(self, sleep: Callable[[float], None] = time.sleep) -> None:
+		self.build()
+		observer = self._start_observer()
+		print(f"[watch] Watching {self.images_dir} and {self.rate_list} (Ctrl+C to stop)")
+		try:
+			while True:
+				self._wait_for_change(sleep)
+				try:
+					self.update()
+				except Exception as e:
+					# Keep watching; nothing was recorded as done, so the next
+					# check retries the same changes
+					print(f"Warning: Catalog update failed: {e}")
+		except KeyboardInterrupt:
+			pass
+		finally:
+			if observer is not None:
+				observer.stop()
+				observer.join()